@@ -13,17 +13,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import argparse
 import matplotlib
 import matplotlib.pyplot as plt
 import numpy as np
+import os
 import pandas as pd
 import seaborn as sns
-from lingua import Language
+
+from accuracy_report_data import (
+    ReportOutput,
+    build_outputs,
+    prefixes,
+    single_language_mode_columns,
+)
+from functools import partial
 from math import floor
 from matplotlib.patches import Patch
 from pathlib import Path
 
-matplotlib.use("TkAgg")
+# The plots are only saved to files, so no display is required
+matplotlib.use("Agg")
 sns.set()
 sns.set_style("whitegrid")
 
@@ -46,9 +56,7 @@ class AccuracyPlotDrawer:
         "lingua-single-language-detector": "Lingua 2.2.0\nsingle language mode",
         "simplemma": "Simplemma 0.9.1",
     }
-    _single_language_mode_columns = [
-        f"lingua-{language.name.lower()}-detector" for language in Language.all()
-    ]
+    _single_language_mode_columns = single_language_mode_columns
     _hatches = ("x", "+", "\\", "o", "oo", ".", "*", "O")
     _palette = (
         "#b259ff",
@@ -62,21 +70,11 @@ class AccuracyPlotDrawer:
     )
     _ticks = np.arange(0, 101, 10)
 
-    def __init__(self, plot_title: str, report_file_path: Path):
+    def __init__(self, plot_title: str, accuracy_report: pd.DataFrame):
         self._plot_title = plot_title
-        self._dataframe = self._read_into_dataframe(report_file_path)
-
-    def _read_into_dataframe(self, report_file_path: Path) -> pd.DataFrame:
-        df = pd.read_csv(report_file_path, index_col="language")
-
-        merged_single_language_mode_column = {
-            "lingua-single-language-detector": df[
-                self._single_language_mode_columns
-            ].mean(axis="columns")
-        }
-
-        df = df.assign(**merged_single_language_mode_column)
+        self._dataframe = self._melt_dataframe(accuracy_report)
 
+    def _melt_dataframe(self, df: pd.DataFrame) -> pd.DataFrame:
         # Sort classifier columns by their mean value
         df = df.reindex(df.mean().sort_values().index, axis="columns")
 
@@ -133,6 +131,7 @@ class AccuracyPlotDrawer:
 
         plt.tight_layout()
         plt.savefig(file_path, dpi=self._dpi)
+        plt.close()
 
     def draw_boxplot(self, file_path: Path):
         row_filter = self._dataframe[self._hue].isin(self._column_labels.keys())
@@ -177,6 +176,7 @@ class AccuracyPlotDrawer:
 
         plt.tight_layout()
         plt.savefig(file_path, dpi=self._dpi)
+        plt.close()
 
     def draw_single_language_mode_boxplot(self, file_path: Path):
         row_filter = self._dataframe[self._hue].isin(self._single_language_mode_columns)
@@ -220,23 +220,90 @@ class AccuracyPlotDrawer:
 
         plt.tight_layout()
         plt.savefig(file_path, dpi=self._dpi)
+        plt.close()
 
 
-if __name__ == "__main__":
-    report_directory_path = Path(__file__).parent / "../accuracy-reports"
+plot_types = {
+    "barplot": ("barplot-{prefix}.png", AccuracyPlotDrawer.draw_barplot),
+    "boxplot": ("boxplot-{prefix}.png", AccuracyPlotDrawer.draw_boxplot),
+    "single-language-mode-boxplot": (
+        "boxplot-single-language-mode-{prefix}.png",
+        AccuracyPlotDrawer.draw_single_language_mode_boxplot,
+    ),
+}
+
+
+def get_plot_file_path(prefix: str, plot_type: str) -> Path:
+    file_name_template, _ = plot_types[plot_type]
     plot_directory_path = Path(__file__).parent / "../images/plots"
-    prefixes = ("average", "single-words", "word-pairs", "sentences")
+    return plot_directory_path / file_name_template.format(prefix=prefix)
 
-    for prefix in prefixes:
-        plot_title = prefix.title().replace("-", " ")
-        drawer = AccuracyPlotDrawer(
-            plot_title=f"{plot_title} Detection Performance",
-            report_file_path=report_directory_path / f"{prefix}-accuracy-values.csv",
-        )
-        drawer.draw_barplot(file_path=plot_directory_path / f"barplot-{prefix}.png")
-        drawer.draw_boxplot(file_path=plot_directory_path / f"boxplot-{prefix}.png")
-        drawer.draw_single_language_mode_boxplot(
-            file_path=plot_directory_path / f"boxplot-single-language-mode-{prefix}.png"
+
+def get_plot_code_file_paths() -> list[Path]:
+    return [Path(__file__), Path(__file__).parent / "accuracy_report_data.py"]
+
+
+def draw_plot(prefix: str, accuracy_report: pd.DataFrame, plot_type: str):
+    plot_title = prefix.title().replace("-", " ")
+    drawer = AccuracyPlotDrawer(
+        plot_title=f"{plot_title} Detection Performance",
+        accuracy_report=accuracy_report,
+    )
+    _, draw = plot_types[plot_type]
+    draw(drawer, get_plot_file_path(prefix, plot_type))
+
+
+def get_plot_outputs(
+    selected_prefixes: list[str], selected_plot_types: list[str]
+) -> list[ReportOutput]:
+    return [
+        ReportOutput(
+            prefix=prefix,
+            file_path=get_plot_file_path(prefix, plot_type),
+            code_file_paths=get_plot_code_file_paths(),
+            build=partial(draw_plot, plot_type=plot_type),
+            # Matplotlib figures cannot be shared between threads,
+            # so every plot is drawn in a worker process of its own
+            runs_in_worker=True,
         )
+        for prefix in selected_prefixes
+        for plot_type in selected_plot_types
+    ]
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Draw the bar plots and box plots of the accuracy reports"
+    )
+    parser.add_argument(
+        "--prefixes", nargs="+", choices=prefixes, default=list(prefixes)
+    )
+    parser.add_argument(
+        "--plot-types", nargs="+", choices=list(plot_types), default=list(plot_types)
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes drawing the plots (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="skip plots whose CSV file has not changed since they were last drawn "
+        "by this script or the report pipeline",
+    )
+    return parser.parse_args()
 
-    print("All plots created successfully")
+
+def main():
+    args = parse_command_line_args()
+    build_outputs(
+        get_plot_outputs(args.prefixes, args.plot_types),
+        args.processes,
+        force=not args.incremental,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import json
+import pandas as pd
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from lingua import Language
+from pathlib import Path
+from typing import Callable
+
+_root_directory_path = Path(__file__).parent / ".."
+
+prefixes = ("average", "single-words", "word-pairs", "sentences")
+
+single_language_mode_columns = [
+    f"lingua-{language.name.lower()}-detector" for language in Language.all()
+]
+
+
+def get_report_file_path(prefix: str) -> Path:
+    return Path(__file__).parent / f"../accuracy-reports/{prefix}-accuracy-values.csv"
+
+
+def read_accuracy_report(report_file_path: Path) -> pd.DataFrame:
+    # The accuracy values of all single language detectors are merged into one
+    # column, the columns of the single language detectors are kept for the plots
+    df = pd.read_csv(report_file_path, index_col="language")
+    return df.assign(
+        **{
+            "lingua-single-language-detector": df[single_language_mode_columns].mean(
+                axis="columns"
+            )
+        }
+    )
+
+
+def compute_source_hash(prefix: str, code_file_paths: list[Path]) -> str:
+    # An output depends on its CSV file and on the code producing it
+    digest = hashlib.sha256()
+    digest.update(get_report_file_path(prefix).read_bytes())
+    for code_file_path in code_file_paths:
+        digest.update(code_file_path.read_bytes())
+    return digest.hexdigest()
+
+
+@dataclass
+class ReportOutput:
+    # A table or plot built from the accuracy report of a single prefix.
+    # Outputs which take long to build are built in worker processes.
+    prefix: str
+    file_path: Path
+    code_file_paths: list[Path]
+    build: Callable[[str, pd.DataFrame], None]
+    runs_in_worker: bool
+
+    @property
+    def name(self) -> str:
+        return (
+            self.file_path.resolve()
+            .relative_to(_root_directory_path.resolve())
+            .as_posix()
+        )
+
+
+def find_outdated_outputs(
+    outputs: list[ReportOutput], output_hashes: dict[str, str], force: bool
+) -> list[tuple[ReportOutput, str]]:
+    # An output is rebuilt if the hash of its CSV file and code has changed
+    outdated_outputs = []
+    for output in outputs:
+        source_hash = compute_source_hash(output.prefix, output.code_file_paths)
+        if (
+            force
+            or not output.file_path.is_file()
+            or output_hashes.get(output.name) != source_hash
+        ):
+            outdated_outputs.append((output, source_hash))
+    return outdated_outputs
+
+
+def build_output(
+    build: Callable[[str, pd.DataFrame], None],
+    prefix: str,
+    accuracy_report: pd.DataFrame,
+) -> float:
+    start = time.perf_counter()
+    build(prefix, accuracy_report)
+    return time.perf_counter() - start
+
+
+def build_outputs(outputs: list[ReportOutput], processes: int, force: bool):
+    hash_file_path = _root_directory_path / ".cache/report-hashes.json"
+    try:
+        with hash_file_path.open(mode="r") as hash_file:
+            output_hashes: dict[str, str] = json.load(hash_file)
+    except FileNotFoundError:
+        output_hashes = {}
+
+    outdated_outputs = find_outdated_outputs(outputs, output_hashes, force)
+    print(
+        f"Building {len(outdated_outputs)} outputs, "
+        f"{len(outputs) - len(outdated_outputs)} outputs are up to date..."
+    )
+    start = time.perf_counter()
+
+    # Every CSV file is read once and shared by all of its outputs
+    accuracy_reports = {
+        prefix: read_accuracy_report(get_report_file_path(prefix))
+        for prefix in {output.prefix for output, _ in outdated_outputs}
+    }
+
+    with ProcessPoolExecutor(max_workers=max(processes, 1)) as executor:
+        futures = [
+            (
+                output,
+                source_hash,
+                executor.submit(
+                    build_output,
+                    output.build,
+                    output.prefix,
+                    accuracy_reports[output.prefix],
+                ),
+            )
+            for output, source_hash in outdated_outputs
+            if output.runs_in_worker
+        ]
+
+        # The other outputs are built while the workers are busy
+        for output, source_hash in outdated_outputs:
+            if not output.runs_in_worker:
+                seconds = build_output(
+                    output.build, output.prefix, accuracy_reports[output.prefix]
+                )
+                output_hashes[output.name] = source_hash
+                print(f"{output.file_path.name} built in {seconds:.2f} seconds")
+
+        for output, source_hash, future in futures:
+            seconds = future.result()
+            output_hashes[output.name] = source_hash
+            print(f"{output.file_path.name} built in {seconds:.2f} seconds")
+
+    hash_file_path.parent.mkdir(parents=True, exist_ok=True)
+    with hash_file_path.open(mode="w") as hash_file:
+        json.dump(output_hashes, hash_file, indent=2, sort_keys=True)
+
+    print(
+        f"All outputs created successfully in {time.perf_counter() - start:.2f} seconds"
+    )
@@ -0,0 +1,57 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import os
+
+from accuracy_plot_drawer import get_plot_outputs, plot_types
+from accuracy_report_data import build_outputs, prefixes
+from accuracy_table_writer import get_table_outputs
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Write the accuracy tables and draw the plots of all accuracy "
+        "reports whose CSV files have changed"
+    )
+    parser.add_argument(
+        "--prefixes", nargs="+", choices=prefixes, default=list(prefixes)
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes drawing the plots (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="rebuild all outputs even if their inputs have not changed",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    build_outputs(
+        get_table_outputs(args.prefixes)
+        + get_plot_outputs(args.prefixes, list(plot_types)),
+        args.processes,
+        args.force,
+    )
+
+
+if __name__ == "__main__":
+    main()
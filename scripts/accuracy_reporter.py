@@ -15,6 +15,8 @@
 
 import argparse
 import gcld3
+import hashlib
+import json
 import langdetect
 import langid
 import numpy as np
@@ -24,23 +26,26 @@ import pycld2
 import time
 
 from collections import Counter
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import nullcontext
 from dataclasses import dataclass
-from enum import Enum, auto
+from functools import cached_property
+from importlib.metadata import version
 from pathlib import Path
-from typing import Optional
+from typing import ContextManager, Iterable, Iterator, Optional
 
 from simplemma.langdetect import lang_detector as simplemma_detector
-from lingua import IsoCode639_1, Language, LanguageDetectorBuilder
-
-
-class Category(Enum):
-    AVERAGE = auto()
-    SINGLE_WORDS = auto()
-    WORD_PAIRS = auto()
-    SENTENCES = auto()
-
-    def folder_name(self) -> str:
-        return self.name.lower().replace("_", "-")
+from adaptive_language_detector import AdaptiveLanguageDetector
+from detection_instrumentation import LatencyRecorder, create_profiler, detect_timed
+from lingua import IsoCode639_1, Language, LanguageDetector, LanguageDetectorBuilder
+from prediction_results import (
+    PredictionCounts,
+    PredictionResults,
+    decode_language,
+    get_results_directory,
+    supported_languages,
+)
+from test_data_corpus import Category, TestDataCorpus, test_data_categories
 
 
 @dataclass
@@ -57,41 +62,46 @@ class DetectorStatistics:
     _average_accuracy: float
 
     @classmethod
-    def new(
-        cls, detector_name: str, is_single_language_detector: bool, language: Language
-    ) -> "DetectorStatistics":
-        return DetectorStatistics(
-            _detector_name=detector_name,
-            _is_single_language_detector=is_single_language_detector,
-            _language=language,
-            _single_word_statistic=Statistic.new(),
-            _word_pair_statistic=Statistic.new(),
-            _sentence_statistic=Statistic.new(),
-            _single_word_accuracy=0.0,
-            _word_pair_accuracy=0.0,
-            _sentence_accuracy=0.0,
-            _average_accuracy=0.0,
-        )
-
-    def add_single_word_counts(self, language: Optional[Language], single_word: str):
-        self._single_word_statistic.add_language_count(language)
-        self._single_word_statistic.add_entity_count()
-        self._single_word_statistic.add_entity_length_count(single_word)
-
-    def add_word_pair_counts(self, language: Optional[Language], word_pair: str):
-        self._word_pair_statistic.add_language_count(language)
-        self._word_pair_statistic.add_entity_count()
-        self._word_pair_statistic.add_entity_length_count(word_pair)
+    def from_prediction_counts(
+        cls, prediction_counts: PredictionCounts
+    ) -> dict[str, list["DetectorStatistics"]]:
+        statistics: dict[tuple[int, int], dict[int, Statistic]] = {}
+
+        for unit_id, (detector, language, category) in enumerate(
+            zip(
+                prediction_counts.detector,
+                prediction_counts.language,
+                prediction_counts.category,
+            )
+        ):
+            statistics.setdefault((detector, language), {})[category] = (
+                Statistic.from_prediction_counts(prediction_counts, unit_id)
+            )
 
-    def add_sentence_counts(self, language: Optional[Language], sentence: str):
-        self._sentence_statistic.add_language_count(language)
-        self._sentence_statistic.add_entity_count()
-        self._sentence_statistic.add_entity_length_count(sentence)
+        all_statistics: dict[str, list[DetectorStatistics]] = {}
+
+        for (detector, language), category_statistics in statistics.items():
+            detector_name = prediction_counts.detector_names[detector]
+            all_statistics.setdefault(detector_name, []).append(
+                DetectorStatistics(
+                    _detector_name=detector_name,
+                    _is_single_language_detector=is_single_language_detector_name(
+                        detector_name
+                    ),
+                    _language=supported_languages[language],
+                    _single_word_statistic=category_statistics[
+                        Category.SINGLE_WORDS.value
+                    ],
+                    _word_pair_statistic=category_statistics[Category.WORD_PAIRS.value],
+                    _sentence_statistic=category_statistics[Category.SENTENCES.value],
+                    _single_word_accuracy=0.0,
+                    _word_pair_accuracy=0.0,
+                    _sentence_accuracy=0.0,
+                    _average_accuracy=0.0,
+                )
+            )
 
-    def compute_accuracy_values(self):
-        self._single_word_statistic.map_counts_to_accuracy_values()
-        self._word_pair_statistic.map_counts_to_accuracy_values()
-        self._sentence_statistic.map_counts_to_accuracy_values()
+        return all_statistics
 
     def create_report_data(self) -> Optional[str]:
         language = (
@@ -130,56 +140,28 @@ class DetectorStatistics:
             f"{sentence_report}"
         )
 
-    def to_dataframe(self, category: Category) -> pd.DataFrame:
-        accuracy = np.nan
-
-        if category == Category.AVERAGE and self._average_accuracy > 0:
-            accuracy = self._average_accuracy
-        elif category == Category.SINGLE_WORDS and self._single_word_accuracy > 0:
-            accuracy = self._single_word_accuracy
-        elif category == Category.WORD_PAIRS and self._word_pair_accuracy > 0:
-            accuracy = self._word_pair_accuracy
-        elif category == Category.SENTENCES and self._sentence_accuracy > 0:
-            accuracy = self._sentence_accuracy
-
-        return pd.DataFrame(
-            {
-                self._detector_name: [accuracy * 100],
-            },
-            index=[self._language.name.title()],
-        )
-
 
 @dataclass
 class Statistic:
-    _language_counts: Counter[Optional[Language]]
     _language_accuracies: dict[Optional[Language], float]
     _entity_count: int
     _entity_length_count: int
 
     @classmethod
-    def new(cls) -> "Statistic":
+    def from_prediction_counts(
+        cls, prediction_counts: PredictionCounts, unit_id: int
+    ) -> "Statistic":
+        counts = prediction_counts.counts[unit_id]
+        entity_count = int(prediction_counts.text_count[unit_id])
         return Statistic(
-            _language_counts=Counter(),
-            _language_accuracies={},
-            _entity_count=0,
-            _entity_length_count=0,
+            _language_accuracies={
+                decode_language(int(code) - 1): counts[code] / entity_count
+                for code in np.flatnonzero(counts)
+            },
+            _entity_count=entity_count,
+            _entity_length_count=int(prediction_counts.text_length_sum[unit_id]),
         )
 
-    def add_language_count(self, language: Optional[Language]):
-        self._language_counts[language] += 1
-
-    def add_entity_count(self):
-        self._entity_count += 1
-
-    def add_entity_length_count(self, entity: str):
-        self._entity_length_count += len(entity)
-
-    def map_counts_to_accuracy_values(self):
-        sum_of_counts = sum(self._language_counts.values())
-        for language, count in self._language_counts.items():
-            self._language_accuracies[language] = count / sum_of_counts
-
     def create_report_data(
         self, language: Optional[Language], description: str
     ) -> tuple[float, str]:
@@ -214,94 +196,359 @@ class Statistic:
         return ", ".join(substrs)
 
 
+class PredictionCache:
+    def __init__(self, cache_directory: Path):
+        self._cache_directory = cache_directory
+
+    def load(
+        self,
+        detector: "AbstractLanguageDetector",
+        language: Language,
+        category: Category,
+    ) -> Optional[list[Optional[Language]]]:
+        cache_file_path = self._get_cache_file_path(detector, language, category)
+        try:
+            with cache_file_path.open(mode="r") as cache_file:
+                language_names = json.load(cache_file)
+        except FileNotFoundError:
+            return None
+
+        return [
+            Language.from_str(name) if name is not None else None
+            for name in language_names
+        ]
+
+    def store(
+        self,
+        detector: "AbstractLanguageDetector",
+        language: Language,
+        category: Category,
+        detected_languages: list[Optional[Language]],
+    ):
+        cache_file_path = self._get_cache_file_path(detector, language, category)
+        cache_file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = cache_file_path.with_suffix(".tmp")
+
+        with temporary_file_path.open(mode="w") as cache_file:
+            json.dump(
+                [
+                    lang.name if lang is not None else None
+                    for lang in detected_languages
+                ],
+                cache_file,
+            )
+
+        os.replace(temporary_file_path, cache_file_path)
+
+    def _get_cache_file_path(
+        self,
+        detector: "AbstractLanguageDetector",
+        language: Language,
+        category: Category,
+    ) -> Path:
+        key = compute_unit_key(detector, language, category)
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+        return self._cache_directory / detector.detector_name / f"{digest}.json"
+
+
+class RunCheckpoint:
+    # The predictions of each completed (detector, language) pair are stored
+    # in their own file, so that an interrupted run can be resumed without
+    # classifying them again. The file names contain the keys of all test data
+    # files of the language, so outdated checkpoints are never loaded.
+    def __init__(self, checkpoint_directory: Path, is_resuming: bool):
+        self._checkpoint_directory = checkpoint_directory
+        self._is_resuming = is_resuming
+        self._file_paths: set[Path] = set()
+
+    def load(
+        self, detector: "AbstractLanguageDetector", language: Language
+    ) -> dict[Category, list[Optional[Language]]]:
+        if not self._is_resuming:
+            return {}
+
+        file_path = self._get_checkpoint_file_path(detector, language)
+        try:
+            results = PredictionResults.load(file_path)
+        except FileNotFoundError:
+            return {}
+        self._file_paths.add(file_path)
+
+        detected_languages = {}
+        for category in test_data_categories:
+            rows = np.flatnonzero(results.category == category.value)
+            if len(rows) > 0:
+                rows = rows[np.argsort(results.text_index[rows])]
+                detected_languages[category] = [
+                    decode_language(int(code)) for code in results.predicted[rows]
+                ]
+        return detected_languages
+
+    def store(
+        self,
+        detector: "AbstractLanguageDetector",
+        language: Language,
+        results: PredictionResults,
+    ):
+        # The results are written to a temporary file first and then renamed
+        file_path = self._get_checkpoint_file_path(detector, language)
+        results.save(file_path)
+        self._file_paths.add(file_path)
+
+    def remove(self):
+        # Only the checkpoints of this run are removed,
+        # those of other interrupted runs are kept
+        for file_path in self._file_paths:
+            file_path.unlink(missing_ok=True)
+            try:
+                file_path.parent.rmdir()
+            except OSError:
+                pass
+        self._file_paths.clear()
+
+    def _get_checkpoint_file_path(
+        self, detector: "AbstractLanguageDetector", language: Language
+    ) -> Path:
+        key = "\n".join(
+            compute_unit_key(detector, language, category)
+            for category in test_data_categories
+        )
+        digest = hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+        file_name = f"{language.name.title()}-{digest}.npz"
+        return self._checkpoint_directory / detector.detector_name / file_name
+
+
 class AbstractLanguageDetector:
+    is_multi_threaded = False
+    package_name = ""
+    detector_options = ""
+    recorder: Optional[LatencyRecorder] = None
+
     def __init__(
         self,
         detector_name: str,
         is_single_language_detector: bool,
         languages: list[Language],
     ):
-        accuracy_reports_directory = Path(__file__).parent / "../accuracy-reports"
         self.detector_name = detector_name
         self.is_single_language_detector = is_single_language_detector
         self.languages = languages
-        self.reports_directory = accuracy_reports_directory / detector_name
-        self.single_words = self._get_file_content(Category.SINGLE_WORDS.folder_name())
-        self.word_pairs = self._get_file_content(Category.WORD_PAIRS.folder_name())
-        self.sentences = self._get_file_content(Category.SENTENCES.folder_name())
+        self.reports_directory = get_reports_directory(detector_name)
+        self.corpus = TestDataCorpus.load()
 
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return []
 
-    def _get_file_content(self, subdirectory: str) -> dict[Language, list[str]]:
-        file_content = {}
-        test_data_directory = Path(__file__).parent / "../language-testdata"
+    def _detect_in_parallel(self, texts: list[str]) -> list[Optional[Language]]:
+        return self._detect(texts)
+
+    def get_test_data(self, category: Category) -> dict[Language, list[str]]:
+        return {
+            language: self.corpus.get_texts(language, category)
+            for language in self.languages
+        }
+
+    def collect_predictions(
+        self,
+        processes: Optional[int] = None,
+        cache: Optional[PredictionCache] = None,
+        units: Optional[list[tuple[Language, Category]]] = None,
+        checkpoint: Optional[RunCheckpoint] = None,
+    ) -> PredictionResults:
+        if not self.reports_directory.is_dir():
+            os.makedirs(self.reports_directory)
+
+        if units is None:
+            units = self.get_test_data_units()
+        cached_results = self.load_cached_results(units, cache)
+        cached_results.update(self.load_checkpointed_results(units, checkpoint))
+        missing_units = [unit for unit in units if unit not in cached_results]
 
-        for language in self.languages:
-            test_data_file_name = f"{language.iso_code_639_1.name.lower()}.txt"
-            test_data_file_path = (
-                test_data_directory / subdirectory / test_data_file_name
+        executor_context: ContextManager[Optional[Executor]]
+        if processes is None or self.is_multi_threaded or len(missing_units) == 0:
+            executor_context = nullcontext()
+        else:
+            executor_context = ProcessPoolExecutor(
+                max_workers=processes,
+                initializer=init_worker_detector,
+                initargs=(self.detector_name,),
             )
 
-            with test_data_file_path.open(mode="r") as test_data_file:
-                file_content[language] = [
-                    line.rstrip() for line in test_data_file if len(line.rstrip()) > 0
-                ]
+        with executor_context as executor:
+            # Each test data file is sent as a single batch
+            detection_results = self._detect_batches(
+                missing_units, processes is not None, executor
+            )
 
-        return file_content
+            def results() -> Iterator[list[Optional[Language]]]:
+                for language, category in units:
+                    if (language, category) in cached_results:
+                        yield cached_results[(language, category)]
+                    else:
+                        detected_languages = next(detection_results)
+                        if cache is not None:
+                            cache.store(self, language, category, detected_languages)
+                        yield detected_languages
 
-    def collect_statistics(self) -> list[DetectorStatistics]:
-        if not self.reports_directory.is_dir():
-            os.makedirs(self.reports_directory)
+            return self._compute_results(results(), units, checkpoint)
 
-        total_language_count = len(self.languages)
-        all_statistics = []
+    def get_test_data_units(self) -> list[tuple[Language, Category]]:
+        return [
+            (language, category)
+            for language in self.languages
+            for category in test_data_categories
+        ]
 
-        for idx, language in enumerate(self.languages):
-            name = language.name.title()
-            step = f"({idx+1}/{total_language_count})"
+    def load_cached_results(
+        self,
+        units: list[tuple[Language, Category]],
+        cache: Optional[PredictionCache],
+    ) -> dict[tuple[Language, Category], list[Optional[Language]]]:
+        cached_results = {}
+
+        if cache is not None:
+            for language, category in units:
+                detected_languages = cache.load(self, language, category)
+                if detected_languages is not None:
+                    cached_results[(language, category)] = detected_languages
+
+        if len(cached_results) > 0:
+            print(
+                f"Using cached {self.detector_name} predictions "
+                f"for {len(cached_results)} of {len(units)} test data files"
+            )
 
-            print(f"Collecting {self.detector_name} statistics for {name}... {step}")
+        return cached_results
 
-            statistics = DetectorStatistics.new(
-                self.detector_name, self.is_single_language_detector, language
+    def load_checkpointed_results(
+        self,
+        units: list[tuple[Language, Category]],
+        checkpoint: Optional[RunCheckpoint],
+    ) -> dict[tuple[Language, Category], list[Optional[Language]]]:
+        checkpointed_results = {}
+
+        if checkpoint is not None:
+            for language in dict.fromkeys(language for language, _ in units):
+                for category, detected_languages in checkpoint.load(
+                    self, language
+                ).items():
+                    if (language, category) in units:
+                        checkpointed_results[(language, category)] = detected_languages
+
+        if len(checkpointed_results) > 0:
+            print(
+                f"Resuming {self.detector_name} with checkpointed predictions "
+                f"for {len(checkpointed_results)} of {len(units)} test data files"
             )
 
-            detected_languages = self._detect(self.single_words[language])
-            for single_word, detected_language in zip(
-                self.single_words[language], detected_languages
-            ):
-                statistics.add_single_word_counts(detected_language, single_word)
+        return checkpointed_results
 
-            detected_languages = self._detect(self.word_pairs[language])
-            for word_pair, detected_language in zip(
-                self.word_pairs[language], detected_languages
-            ):
-                statistics.add_word_pair_counts(detected_language, word_pair)
+    def _detect_batches(
+        self,
+        units: list[tuple[Language, Category]],
+        use_multiple_threads: bool,
+        executor: Optional[Executor],
+    ) -> Iterator[list[Optional[Language]]]:
+        if self.recorder is not None:
+            return self._detect_batches_timed(units, executor)
+
+        # Worker processes read the test data from the memory-mapped
+        # corpus themselves, so only the unit keys need to be pickled
+        if executor is not None:
+            return executor.map(detect_in_worker, units)
+
+        detect = self._detect_in_parallel if use_multiple_threads else self._detect
+        return (
+            detect(self.corpus.get_texts(language, category))
+            for language, category in units
+        )
 
-            detected_languages = self._detect(self.sentences[language])
-            for sentence, detected_language in zip(
-                self.sentences[language], detected_languages
-            ):
-                statistics.add_sentence_counts(detected_language, sentence)
+    def _detect_batches_timed(
+        self,
+        units: list[tuple[Language, Category]],
+        executor: Optional[Executor],
+    ) -> Iterator[list[Optional[Language]]]:
+        # The latencies are measured per text with the single-threaded method,
+        # worker processes send them back together with their predictions
+        timed_results = (
+            executor.map(detect_in_worker_timed, units)
+            if executor is not None
+            else (
+                detect_timed(self._detect, self.corpus.get_texts(language, category))
+                for language, category in units
+            )
+        )
+        for (language, category), (detected_languages, latencies) in zip(
+            units, timed_results
+        ):
+            self.record_latencies(language, category, latencies)
+            yield detected_languages
+
+    def record_latencies(
+        self, language: Language, category: Category, latencies: np.ndarray
+    ):
+        if self.recorder is not None:
+            self.recorder.record(
+                self.detector_name,
+                language,
+                category,
+                self.corpus.get_texts(language, category),
+                latencies,
+            )
 
-            statistics.compute_accuracy_values()
+    def get_expected_language(self, language: Language) -> Optional[Language]:
+        if (
+            self.is_single_language_detector
+            and language.name.lower() not in self.detector_name
+        ):
+            return None
+        return language
 
-            all_statistics.append(statistics)
+    def _compute_results(
+        self,
+        detection_results: Iterable[list[Optional[Language]]],
+        units: list[tuple[Language, Category]],
+        checkpoint: Optional[RunCheckpoint] = None,
+    ) -> PredictionResults:
+        total_language_count = len(self.languages)
+        all_results = []
+        remaining_unit_counts = Counter(language for language, _ in units)
+        language_results: dict[Language, list[PredictionResults]] = {}
+
+        for (language, category), detected_languages in zip(units, detection_results):
+            if category == Category.SINGLE_WORDS:
+                name = language.name.title()
+                step = f"({self.languages.index(language)+1}/{total_language_count})"
+                print(
+                    f"Collecting {self.detector_name} statistics for {name}... {step}"
+                )
+
+            unit_results = PredictionResults.from_detected_languages(
+                self.detector_name,
+                language,
+                category,
+                self.get_expected_language(language),
+                detected_languages,
+                self.corpus.get_texts(language, category),
+            )
+            all_results.append(unit_results)
+            language_results.setdefault(language, []).append(unit_results)
+            remaining_unit_counts[language] -= 1
 
-        return all_statistics
+            # As soon as a language is complete, its predictions are checkpointed
+            # and its report is written, so that neither gets lost on interruption
+            if checkpoint is not None and remaining_unit_counts[language] == 0:
+                results = PredictionResults.concat(language_results.pop(language))
+                checkpoint.store(self, language, results)
+                if len(np.unique(results.category)) == len(test_data_categories):
+                    write_detector_reports(self.detector_name, results)
 
-    def write_reports(self, statistics: list[DetectorStatistics]):
-        for stat in statistics:
-            report = stat.create_report_data()
-            if report is not None:
-                report_file_name = f"{stat._language.name.title()}.txt"
-                report_file_path = self.reports_directory / report_file_name
-                with report_file_path.open(mode="w") as report_file:
-                    report_file.write(report)
+        return PredictionResults.concat(all_results)
 
 
 class CLD2Detector(AbstractLanguageDetector):
+    package_name = "pycld2"
+
     def __init__(self, languages: list[Language]):
         super(CLD2Detector, self).__init__("cld2", False, languages)
 
@@ -316,9 +563,15 @@ class CLD2Detector(AbstractLanguageDetector):
 
 
 class CLD3Detector(AbstractLanguageDetector):
+    package_name = "gcld3"
+    detector_options = "min_num_bytes=0, max_num_bytes=512"
+
     def __init__(self, languages: list[Language]):
         super(CLD3Detector, self).__init__("cld3", False, languages)
-        self.detector = gcld3.NNetLanguageIdentifier(min_num_bytes=0, max_num_bytes=512)
+
+    @cached_property
+    def detector(self) -> gcld3.NNetLanguageIdentifier:
+        return gcld3.NNetLanguageIdentifier(min_num_bytes=0, max_num_bytes=512)
 
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return [
@@ -328,6 +581,8 @@ class CLD3Detector(AbstractLanguageDetector):
 
 
 class LangdetectDetector(AbstractLanguageDetector):
+    package_name = "langdetect"
+
     def __init__(self, languages: list[Language]):
         super(LangdetectDetector, self).__init__("langdetect", False, languages)
 
@@ -342,6 +597,8 @@ class LangdetectDetector(AbstractLanguageDetector):
 
 
 class LangidDetector(AbstractLanguageDetector):
+    package_name = "langid"
+
     def __init__(self, languages: list[Language]):
         super(LangidDetector, self).__init__("langid", False, languages)
 
@@ -350,11 +607,18 @@ class LangidDetector(AbstractLanguageDetector):
 
 
 class LinguaLowAccuracyDetector(AbstractLanguageDetector):
+    is_multi_threaded = True
+    package_name = "lingua-language-detector"
+    detector_options = "from_all_languages().with_low_accuracy_mode()"
+
     def __init__(self, languages: list[Language]):
         super(LinguaLowAccuracyDetector, self).__init__(
             "lingua-low-accuracy", False, languages
         )
-        self.detector = (
+
+    @cached_property
+    def detector(self) -> LanguageDetector:
+        return (
             LanguageDetectorBuilder.from_all_languages()
             .with_low_accuracy_mode()
             .with_preloaded_language_models()
@@ -364,13 +628,23 @@ class LinguaLowAccuracyDetector(AbstractLanguageDetector):
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return [self.detector.detect_language_of(text) for text in texts]
 
+    def _detect_in_parallel(self, texts: list[str]) -> list[Optional[Language]]:
+        return self.detector.detect_languages_in_parallel_of(texts)
+
 
 class LinguaHighAccuracyDetector(AbstractLanguageDetector):
+    is_multi_threaded = True
+    package_name = "lingua-language-detector"
+    detector_options = "from_all_languages()"
+
     def __init__(self, languages: list[Language]):
         super(LinguaHighAccuracyDetector, self).__init__(
             "lingua-high-accuracy", False, languages
         )
-        self.detector = (
+
+    @cached_property
+    def detector(self) -> LanguageDetector:
+        return (
             LanguageDetectorBuilder.from_all_languages()
             .with_preloaded_language_models()
             .build()
@@ -379,19 +653,68 @@ class LinguaHighAccuracyDetector(AbstractLanguageDetector):
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return [self.detector.detect_language_of(text) for text in texts]
 
+    def _detect_in_parallel(self, texts: list[str]) -> list[Optional[Language]]:
+        return self.detector.detect_languages_in_parallel_of(texts)
+
+
+class LinguaAdaptiveAccuracyDetector(AbstractLanguageDetector):
+    is_multi_threaded = True
+    package_name = "lingua-language-detector"
+    detector_options = (
+        "AdaptiveLanguageDetector(min_text_length=120, min_confidence_margin=0.1)"
+    )
+
+    def __init__(self, languages: list[Language]):
+        super(LinguaAdaptiveAccuracyDetector, self).__init__(
+            "lingua-adaptive-accuracy", False, languages
+        )
+
+    @cached_property
+    def detector(self) -> AdaptiveLanguageDetector:
+        return AdaptiveLanguageDetector(
+            LanguageDetectorBuilder.from_all_languages()
+            .with_low_accuracy_mode()
+            .with_preloaded_language_models()
+            .build(),
+            LanguageDetectorBuilder.from_all_languages()
+            .with_preloaded_language_models()
+            .build(),
+            min_text_length=120,
+            min_confidence_margin=0.1,
+        )
+
+    def _detect(self, texts: list[str]) -> list[Optional[Language]]:
+        return [self.detector.detect_language_of(text) for text in texts]
+
+    def _detect_in_parallel(self, texts: list[str]) -> list[Optional[Language]]:
+        return self.detector.detect_languages_in_parallel_of(texts)
+
 
 class LinguaSingleLanguageDetector(AbstractLanguageDetector):
+    is_multi_threaded = True
+    package_name = "lingua-language-detector"
+
     def __init__(self, language: Language, languages: list[Language]):
         super(LinguaSingleLanguageDetector, self).__init__(
             f"lingua-{language.name.lower()}-detector", True, languages
         )
-        self.detector = LanguageDetectorBuilder.from_languages(language).build()
+        self.language = language
+        self.detector_options = f"from_languages(Language.{language.name})"
+
+    @cached_property
+    def detector(self) -> LanguageDetector:
+        return LanguageDetectorBuilder.from_languages(self.language).build()
 
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return [self.detector.detect_language_of(text) for text in texts]
 
+    def _detect_in_parallel(self, texts: list[str]) -> list[Optional[Language]]:
+        return self.detector.detect_languages_in_parallel_of(texts)
+
 
 class SimplemmaDetector(AbstractLanguageDetector):
+    package_name = "simplemma"
+
     def __init__(self, languages: list[Language]):
         super(SimplemmaDetector, self).__init__("simplemma", False, languages)
         self.iso_codes = tuple(
@@ -440,6 +763,7 @@ class SimplemmaDetector(AbstractLanguageDetector):
                 Language.UKRAINIAN,
             ]
         )
+        self.detector_options = f"lang={self.iso_codes}"
 
     def _detect(self, texts: list[str]) -> list[Optional[Language]]:
         return [
@@ -448,6 +772,135 @@ class SimplemmaDetector(AbstractLanguageDetector):
         ]
 
 
+class SingleLanguageDetectorSweep:
+    def __init__(
+        self, detectors: list[LinguaSingleLanguageDetector], languages: list[Language]
+    ):
+        self._detectors = detectors
+        self._languages = languages
+        self._units = [
+            (language, category)
+            for language in languages
+            for category in test_data_categories
+        ]
+        self._results: dict[
+            str, dict[tuple[Language, Category], list[Optional[Language]]]
+        ] = {}
+
+    def collect_predictions(
+        self,
+        cache: Optional[PredictionCache] = None,
+        checkpoint: Optional[RunCheckpoint] = None,
+    ) -> dict[str, PredictionResults]:
+        corpus = TestDataCorpus.load()
+        total_unit_count = len(self._units)
+
+        for detector in self._detectors:
+            if not detector.reports_directory.is_dir():
+                os.makedirs(detector.reports_directory)
+            self._results[detector.detector_name] = detector.load_cached_results(
+                self._units, cache
+            )
+            self._results[detector.detector_name].update(
+                detector.load_checkpointed_results(self._units, checkpoint)
+            )
+
+        # The corpus is traversed only once and every test data file is classified
+        # by all single language detectors in a row, no detection work is shared
+        for idx, (language, category) in enumerate(self._units):
+            name = language.name.title()
+            step = f"({idx+1}/{total_unit_count})"
+            texts = None
+
+            print(f"Sweeping {category.folder_name()} for {name}... {step}")
+
+            for detector in self._detectors:
+                results = self._results[detector.detector_name]
+                if (language, category) in results:
+                    continue
+                if texts is None:
+                    texts = corpus.get_texts(language, category)
+
+                if detector.recorder is not None:
+                    detected_languages, latencies = detect_timed(
+                        detector._detect, texts
+                    )
+                    detector.record_latencies(language, category, latencies)
+                else:
+                    detected_languages = detector._detect_in_parallel(texts)
+                results[(language, category)] = detected_languages
+
+                if cache is not None:
+                    cache.store(detector, language, category, detected_languages)
+
+            if checkpoint is not None and category == test_data_categories[-1]:
+                language_units = [
+                    (language, category) for category in test_data_categories
+                ]
+                for detector in self._detectors:
+                    detector._compute_results(
+                        (
+                            self._results[detector.detector_name][unit]
+                            for unit in language_units
+                        ),
+                        language_units,
+                        checkpoint,
+                    )
+
+        return {
+            detector.detector_name: detector._compute_results(
+                (self._results[detector.detector_name][unit] for unit in self._units),
+                self._units,
+            )
+            for detector in self._detectors
+        }
+
+    def compute_binary_metrics(self) -> pd.DataFrame:
+        rows = {}
+
+        for detector in self._detectors:
+            results = self._results[detector.detector_name]
+            row = {}
+
+            for category in test_data_categories:
+                true_positives = false_positives = 0
+                false_negatives = true_negatives = 0
+
+                for language in self._languages:
+                    detected_languages = results[(language, category)]
+                    positives = detected_languages.count(detector.language)
+                    negatives = len(detected_languages) - positives
+
+                    if language == detector.language:
+                        true_positives += positives
+                        false_negatives += negatives
+                    else:
+                        false_positives += positives
+                        true_negatives += negatives
+
+                total = (
+                    true_positives + false_positives + false_negatives + true_negatives
+                )
+                prefix = category.folder_name()
+                row[f"{prefix}-precision"] = divide(
+                    true_positives, true_positives + false_positives
+                )
+                row[f"{prefix}-recall"] = divide(
+                    true_positives, true_positives + false_negatives
+                )
+                row[f"{prefix}-accuracy"] = divide(
+                    true_positives + true_negatives, total
+                )
+
+            rows[detector.language.name.title()] = row
+
+        return pd.DataFrame.from_dict(rows, orient="index") * 100
+
+
+def divide(numerator: int, denominator: int) -> float:
+    return numerator / denominator if denominator > 0 else np.nan
+
+
 def format_accuracy(accuracy: float, digits: int = 2) -> str:
     return f"{accuracy*100:.{digits}f}"
 
@@ -465,7 +918,50 @@ def map_detector_to_lingua(iso_code: str) -> Optional[Language]:
         return None
 
 
-def parse_command_line_args() -> tuple[list[str], list[str]]:
+_worker_detector: Optional[AbstractLanguageDetector] = None
+
+
+def init_worker_detector(detector_name: str):
+    global _worker_detector
+    _worker_detector = create_detector_instance(detector_name, [])
+
+
+def detect_in_worker(unit: tuple[Language, Category]) -> list[Optional[Language]]:
+    assert _worker_detector is not None
+    language, category = unit
+    return _worker_detector._detect(
+        _worker_detector.corpus.get_texts(language, category)
+    )
+
+
+def detect_in_worker_timed(
+    unit: tuple[Language, Category],
+) -> tuple[list[Optional[Language]], np.ndarray]:
+    assert _worker_detector is not None
+    language, category = unit
+    return detect_timed(
+        _worker_detector._detect,
+        _worker_detector.corpus.get_texts(language, category),
+    )
+
+
+def parse_detector_names(
+    detector_names: list[str], language_names: list[str]
+) -> list[str]:
+    detector_names = detector_names.copy()
+    all_single_language_detectors_name = "lingua-all-single-language-detectors"
+
+    if all_single_language_detectors_name in detector_names:
+        detector_names.remove(all_single_language_detectors_name)
+        for language_name in language_names:
+            detector_name = f"lingua-{language_name}-detector"
+            if detector_name not in detector_names:
+                detector_names.append(detector_name)
+
+    return detector_names
+
+
+def get_detector_choices() -> tuple[list[str], list[str]]:
     default_languages = [language.name.lower() for language in Language.all()]
     default_detectors = [
         "cld2",
@@ -480,7 +976,14 @@ def parse_command_line_args() -> tuple[list[str], list[str]]:
         [f"lingua-{language}-detector" for language in default_languages]
     )
     detector_choices = default_detectors.copy()
+    detector_choices.append("lingua-adaptive-accuracy")
     detector_choices.append("lingua-all-single-language-detectors")
+    return default_detectors, detector_choices
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    default_languages = [language.name.lower() for language in Language.all()]
+    default_detectors, detector_choices = get_detector_choices()
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--detectors", nargs="+", choices=detector_choices, default=default_detectors
@@ -491,8 +994,91 @@ def parse_command_line_args() -> tuple[list[str], list[str]]:
         choices=default_languages,
         default=default_languages,
     )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="use the multi-threaded methods of Lingua and "
+        "a process pool for all other detectors",
+    )
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count(),
+        help="number of worker processes in parallel mode (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--fused",
+        action="store_true",
+        help="traverse the test data only once and classify each file by all single "
+        "language detectors in a row using the multi-threaded methods of Lingua",
+    )
+    parser.add_argument(
+        "--cache",
+        action="store_true",
+        help="reuse the predictions of previous runs if neither the detector "
+        "nor the test data have changed",
+    )
+    parser.add_argument(
+        "--instrument",
+        action="store_true",
+        help="record a latency histogram and the slowest inputs per detector, "
+        "language, category and text length in benchmark-reports/instrumentation",
+    )
+    parser.add_argument(
+        "--slowest-inputs",
+        type=int,
+        default=5,
+        help="number of slowest inputs kept per histogram (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--profiler",
+        choices=["cprofile", "sampling"],
+        help="profile the run and write the profile to "
+        "benchmark-reports/instrumentation, worker processes are not profiled",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        action="store_true",
+        help="checkpoint the predictions of every completed language, so that "
+        "an interrupted run can be continued with --resume",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="skip the languages whose predictions were checkpointed by "
+        "an interrupted run, checkpoint the remaining ones "
+        "and rebuild all reports afterwards",
+    )
+    parser.add_argument(
+        "--shard-count",
+        type=int,
+        help="split the (detector, language, category) units into this many shards "
+        "and only classify those of the shard given by --shard-index",
+    )
+    parser.add_argument("--shard-index", type=int, default=0)
+    parser.add_argument(
+        "--merge-shards",
+        nargs="+",
+        type=Path,
+        metavar="SHARD_FILE",
+        help="write the reports and aggregated values for the predictions "
+        "of the given shard files instead of classifying any test data",
+    )
     args = parser.parse_args()
-    return args.detectors, args.languages
+
+    if args.shard_count is not None:
+        if not 0 <= args.shard_index < args.shard_count:
+            parser.error("--shard-index must be between 0 and --shard-count - 1")
+        if args.fused:
+            parser.error("--fused cannot be combined with --shard-count")
+        if args.checkpoint or args.resume:
+            parser.error(
+                "--checkpoint and --resume cannot be combined with --shard-count"
+            )
+    if args.merge_shards is not None and args.shard_count is not None:
+        parser.error("--merge-shards cannot be combined with --shard-count")
+
+    return args
 
 
 def create_detector_instance(
@@ -510,7 +1096,9 @@ def create_detector_instance(
         return LinguaHighAccuracyDetector(languages)
     if detector_name == "lingua-low-accuracy":
         return LinguaLowAccuracyDetector(languages)
-    if detector_name.startswith("lingua-") and detector_name.endswith("-detector"):
+    if detector_name == "lingua-adaptive-accuracy":
+        return LinguaAdaptiveAccuracyDetector(languages)
+    if is_single_language_detector_name(detector_name):
         language_name = detector_name.split("-")[1]
         language = Language.from_str(language_name)
         return LinguaSingleLanguageDetector(language, languages)
@@ -519,32 +1107,157 @@ def create_detector_instance(
     return None
 
 
-def main():
-    total_start = time.perf_counter()
-    detector_names, language_names = parse_command_line_args()
-    languages = sorted([Language.from_str(name) for name in language_names])
-    all_statistics = {}
-    all_single_language_detectors_name = "lingua-all-single-language-detectors"
+def write_single_language_metrics(metrics: pd.DataFrame):
+    report_file_path = (
+        Path(__file__).parent / "../accuracy-reports/single-language-mode-metrics.csv"
+    )
 
-    if all_single_language_detectors_name in detector_names:
-        detector_names.remove(all_single_language_detectors_name)
-        for language_name in language_names:
-            detector_name = f"lingua-{language_name}-detector"
-            if detector_name not in detector_names:
-                detector_names.append(detector_name)
+    try:
+        dataframe = pd.read_csv(report_file_path, index_col="language")
+        metrics = pd.concat([dataframe.drop(metrics.index, errors="ignore"), metrics])
+    except FileNotFoundError:
+        pass
 
-    for detector_name in detector_names:
-        detector = create_detector_instance(detector_name, languages)
-        if detector is not None:
-            start = time.perf_counter()
-            statistics = detector.collect_statistics()
-            detector.write_reports(statistics)
-            stop = time.perf_counter()
-            print(f"{detector_name} statistics written in {stop - start:.2f} seconds\n")
-            all_statistics[detector_name] = statistics
+    metrics.sort_index().to_csv(report_file_path, index_label="language", na_rep="NaN")
 
-    print("Updating aggregated reports...")
-    start = time.perf_counter()
+
+def is_single_language_detector_name(detector_name: str) -> bool:
+    return detector_name.startswith("lingua-") and detector_name.endswith("-detector")
+
+
+def get_reports_directory(detector_name: str) -> Path:
+    return Path(__file__).parent / "../accuracy-reports" / detector_name
+
+
+def write_detector_results(detector_name: str, results: PredictionResults):
+    # A run for some languages only must keep the predictions of the other ones
+    results_file_path = get_results_directory() / f"{detector_name}.npz"
+    stored_results = (
+        PredictionResults.load(results_file_path).merge(results)
+        if results_file_path.is_file()
+        else results
+    )
+    stored_results.save(results_file_path)
+    write_detector_reports(detector_name, results)
+
+
+def write_detector_reports(detector_name: str, results: PredictionResults):
+    statistics = DetectorStatistics.from_prediction_counts(results.count_predictions())
+    reports_directory = get_reports_directory(detector_name)
+    reports_directory.mkdir(parents=True, exist_ok=True)
+
+    for stat in statistics[detector_name]:
+        report = stat.create_report_data()
+        if report is not None:
+            report_file_name = f"{stat._language.name.title()}.txt"
+            report_file_path = reports_directory / report_file_name
+            with report_file_path.open(mode="w") as report_file:
+                report_file.write(report)
+
+
+def compute_unit_key(
+    detector: AbstractLanguageDetector, language: Language, category: Category
+) -> str:
+    return "\n".join(
+        [
+            detector.detector_name,
+            detector.package_name,
+            version(detector.package_name),
+            detector.detector_options,
+            detector.corpus.get_file_hash(language, category),
+        ]
+    )
+
+
+def write_instrumentation_report(recorder: LatencyRecorder, file_path: Path):
+    recorder.save(file_path)
+    print("Slowest inputs:")
+    for seconds, detector_name, text in recorder.get_slowest_inputs(10):
+        print(f"{seconds * 1000:10.3f} ms  {detector_name:<24} {text[:60]!r}")
+    print(f"Latency histograms written to {file_path.resolve()}\n")
+
+
+def get_shard_file_path(shard_index: int, shard_count: int) -> Path:
+    shards_directory = Path(__file__).parent / "../accuracy-reports/shards"
+    return shards_directory / f"shard-{shard_index}-of-{shard_count}.npz"
+
+
+def get_shard_units(
+    detector_names: list[str],
+    languages: list[Language],
+    shard_index: int,
+    shard_count: int,
+) -> dict[str, list[tuple[Language, Category]]]:
+    # The units are dealt out in turn, so that the test data
+    # of slow detectors is spread evenly over all shards
+    all_units = [
+        (detector_name, language, category)
+        for detector_name in detector_names
+        for language in languages
+        for category in test_data_categories
+    ]
+    shard_units: dict[str, list[tuple[Language, Category]]] = {}
+    for detector_name, language, category in all_units[shard_index::shard_count]:
+        shard_units.setdefault(detector_name, []).append((language, category))
+    return shard_units
+
+
+def merge_shards(shard_file_paths: list[Path]) -> list[PredictionResults]:
+    results = PredictionResults.concat(
+        [PredictionResults.load(file_path) for file_path in shard_file_paths]
+    )
+    row_keys = np.ravel_multi_index(
+        (
+            results.detector.astype(np.int64),
+            results.language.astype(np.int64),
+            results.category.astype(np.int64),
+            results.text_index.astype(np.int64),
+        ),
+        (
+            max(len(results.detector_names), 1),
+            len(supported_languages),
+            max(category.value for category in Category) + 1,
+            int(results.text_index.max(initial=0)) + 1,
+        ),
+    )
+    if len(np.unique(row_keys)) != len(row_keys):
+        raise ValueError("The shard outputs overlap, each unit must be merged once")
+
+    # The reports need all categories of a language
+    unit_keys = np.unique(row_keys // (int(results.text_index.max(initial=0)) + 1))
+    language_keys, category_counts = np.unique(
+        unit_keys // (max(category.value for category in Category) + 1),
+        return_counts=True,
+    )
+    if np.any(category_counts != len(test_data_categories)):
+        raise ValueError("The shard outputs are incomplete, all shards must be merged")
+
+    all_results = []
+    for code, detector_name in sorted(
+        enumerate(results.detector_names), key=lambda item: item[1]
+    ):
+        # The rows are sorted in the same order as in a single-process run
+        rows = np.flatnonzero(results.detector == code)
+        rows = rows[
+            np.lexsort(
+                (
+                    results.text_index[rows],
+                    results.category[rows],
+                    results.language[rows],
+                )
+            )
+        ]
+        detector_results = results.select(rows)
+        write_detector_results(detector_name, detector_results)
+        all_results.append(detector_results)
+        print(f"{detector_name} statistics written")
+
+    return all_results
+
+
+def update_aggregated_reports(all_results: list[PredictionResults]):
+    prediction_counts = PredictionResults.concat(all_results).count_predictions()
+    all_accuracies = prediction_counts.to_accuracy_dataframes()
 
     for category in Category:
         report_file_path = (
@@ -557,25 +1270,143 @@ def main():
         except FileNotFoundError:
             dataframe = pd.DataFrame()
 
-        for detector_name in detector_names:
-            statistics = all_statistics[detector_name]
-            for stat in statistics:
-                df = stat.to_dataframe(category)
+        dataframe = update_accuracy_values(dataframe, all_accuracies[category])
+        dataframe.to_csv(report_file_path, index_label="language", na_rep="NaN")
 
-                # Update values in existing columns
-                if df.columns.isin(dataframe.columns).all():
-                    row = stat._language.name.title()
-                    for column in df.columns:
-                        dataframe.at[row, column] = df.at[row, column]
 
-                # Add new columns
-                else:
-                    dataframe = pd.concat([dataframe, df], axis=1)
+def update_accuracy_values(
+    dataframe: pd.DataFrame, accuracies: pd.DataFrame
+) -> pd.DataFrame:
+    dataframe = dataframe.reindex(
+        index=dataframe.index.union(accuracies.index, sort=False),
+        columns=dataframe.columns.union(accuracies.columns, sort=False),
+    )
+    dataframe.loc[accuracies.index, accuracies.columns] = accuracies
 
-        # Sort dataframe columns alphabetically
-        dataframe = dataframe.reindex(sorted(dataframe.columns), axis=1)
+    # Sort dataframe columns alphabetically
+    return dataframe.reindex(sorted(dataframe.columns), axis=1)
 
-        dataframe.to_csv(report_file_path, index_label="language", na_rep="NaN")
+
+def main():
+    total_start = time.perf_counter()
+    args = parse_command_line_args()
+    detector_names, language_names = args.detectors, args.languages
+    processes = args.processes if args.parallel else None
+    cache = (
+        PredictionCache(Path(__file__).parent / "../.cache/predictions")
+        if args.cache
+        else None
+    )
+    languages = sorted([Language.from_str(name) for name in language_names])
+    detector_names = parse_detector_names(detector_names, language_names)
+    all_results = []
+    fused_detector_names = []
+    shard_units = None
+
+    # Checkpoints are only read when resuming, a resumed run is checkpointed as well
+    checkpoint: Optional[RunCheckpoint] = (
+        RunCheckpoint(Path(__file__).parent / "../.cache/checkpoints", args.resume)
+        if args.checkpoint or args.resume
+        else None
+    )
+
+    if args.merge_shards is not None:
+        print("Merging shard predictions...")
+        all_results = merge_shards(args.merge_shards)
+        detector_names = []
+        print()
+    elif args.shard_count is not None:
+        shard_units = get_shard_units(
+            detector_names, languages, args.shard_index, args.shard_count
+        )
+        detector_names = list(shard_units)
+        checkpoint = None
+
+    if args.fused:
+        fused_detector_names = [
+            detector_name
+            for detector_name in detector_names
+            if is_single_language_detector_name(detector_name)
+        ]
+
+    profiler = create_profiler(args.profiler)
+    profiler_context: ContextManager = (
+        profiler if profiler is not None else nullcontext()
+    )
+    if args.instrument:
+        AbstractLanguageDetector.recorder = LatencyRecorder(args.slowest_inputs)
+
+    with profiler_context:
+        if len(fused_detector_names) > 0:
+            start = time.perf_counter()
+            single_language_detectors = [
+                LinguaSingleLanguageDetector(
+                    Language.from_str(detector_name.split("-")[1]), languages
+                )
+                for detector_name in fused_detector_names
+            ]
+            sweep = SingleLanguageDetectorSweep(single_language_detectors, languages)
+            sweep_results = sweep.collect_predictions(cache, checkpoint)
+            for detector in single_language_detectors:
+                results = sweep_results[detector.detector_name]
+                write_detector_results(detector.detector_name, results)
+                all_results.append(results)
+            write_single_language_metrics(sweep.compute_binary_metrics())
+            stop = time.perf_counter()
+            print(
+                f"{len(single_language_detectors)} single language detector statistics "
+                f"written in {stop - start:.2f} seconds\n"
+            )
+
+        for detector_name in detector_names:
+            if detector_name in fused_detector_names:
+                continue
+            units = None
+            if shard_units is not None:
+                if detector_name not in shard_units:
+                    continue
+                units = shard_units[detector_name]
+            detector = create_detector_instance(detector_name, languages)
+            if detector is not None:
+                start = time.perf_counter()
+                results = detector.collect_predictions(
+                    processes, cache, units, checkpoint
+                )
+                # The reports of a shard are only written when all shards are merged
+                if shard_units is None:
+                    write_detector_results(detector.detector_name, results)
+                stop = time.perf_counter()
+                print(
+                    f"{detector_name} statistics written in {stop - start:.2f} seconds\n"
+                )
+                all_results.append(results)
+
+    instrumentation_directory = (
+        Path(__file__).parent / "../benchmark-reports/instrumentation"
+    )
+    if profiler is not None:
+        profiler.save(instrumentation_directory)
+        print(f"Profile written to {instrumentation_directory.resolve()}\n")
+    if AbstractLanguageDetector.recorder is not None:
+        write_instrumentation_report(
+            AbstractLanguageDetector.recorder,
+            instrumentation_directory / "latencies.json",
+        )
+
+    if shard_units is not None:
+        shard_file_path = get_shard_file_path(args.shard_index, args.shard_count)
+        shard_file_path.parent.mkdir(parents=True, exist_ok=True)
+        PredictionResults.concat(all_results).save(shard_file_path)
+        print(f"Shard predictions written to {shard_file_path.resolve()}\n")
+        return
+
+    print("Updating aggregated reports...")
+    start = time.perf_counter()
+    update_aggregated_reports(all_results)
+
+    # The run is complete, so its checkpoints are not needed anymore
+    if checkpoint is not None:
+        checkpoint.remove()
 
     total_stop = time.perf_counter()
     total_time = total_stop - total_start
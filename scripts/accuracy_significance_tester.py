@@ -0,0 +1,285 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import pandas as pd
+import sys
+import time
+
+from pathlib import Path
+from prediction_results import (
+    PredictionResults,
+    get_results_directory,
+    supported_languages,
+)
+from test_data_corpus import Category, test_data_categories
+from typing import Optional
+
+
+class AccuracySignificanceTester:
+    def __init__(
+        self,
+        results: PredictionResults,
+        resample_count: int,
+        confidence_level: float,
+        seed: int,
+    ):
+        self._results = results
+        self._resample_count = resample_count
+        self._confidence_level = confidence_level
+        self._rng = np.random.default_rng(seed)
+        self.incomplete_text_count = 0
+        self.skipped_units: list[tuple[str, str]] = []
+
+    def run(self) -> tuple[pd.DataFrame, pd.DataFrame]:
+        detector_names = self._results.detector_names
+        correct = self._results.is_correct()
+        interval_rows = []
+        test_rows = []
+
+        for language_code in np.unique(self._results.language):
+            language_name = supported_languages[language_code].name.title()
+            language_mask = self._results.language == language_code
+            resampled_accuracies = {}
+            observed_accuracies = {}
+
+            for category in test_data_categories:
+                mask = language_mask & (self._results.category == category.value)
+                matrix = self._to_correctness_matrix(
+                    correct[mask],
+                    self._results.detector[mask],
+                    self._results.text_index[mask],
+                )
+                if matrix is None:
+                    self.skipped_units.append((language_name, category.folder_name()))
+                    continue
+                observed_accuracies[category] = matrix.mean(axis=1)
+                resampled_accuracies[category] = self._resample_accuracies(matrix)
+
+            # The average accuracy is resampled per category as well,
+            # so that it stays the mean of the three category accuracies.
+            # It is only computed if all categories can be compared.
+            if len(observed_accuracies) == len(test_data_categories):
+                observed_accuracies[Category.AVERAGE] = np.mean(
+                    [
+                        observed_accuracies[category]
+                        for category in test_data_categories
+                    ],
+                    axis=0,
+                )
+                resampled_accuracies[Category.AVERAGE] = np.mean(
+                    [
+                        resampled_accuracies[category]
+                        for category in test_data_categories
+                    ],
+                    axis=0,
+                )
+
+            for category in Category:
+                if category not in observed_accuracies:
+                    continue
+                interval_rows.extend(
+                    self._compute_confidence_intervals(
+                        category,
+                        language_name,
+                        detector_names,
+                        observed_accuracies[category],
+                        resampled_accuracies[category],
+                    )
+                )
+                test_rows.extend(
+                    self._compute_paired_tests(
+                        category,
+                        language_name,
+                        detector_names,
+                        observed_accuracies[category],
+                        resampled_accuracies[category],
+                    )
+                )
+
+        return pd.DataFrame(interval_rows), pd.DataFrame(test_rows)
+
+    def _to_correctness_matrix(
+        self, correct: np.ndarray, detectors: np.ndarray, text_indices: np.ndarray
+    ) -> Optional[np.ndarray]:
+        # One row per detector and one column per text,
+        # so that all detectors are compared on the same texts.
+        # Texts without a prediction of every detector are left out,
+        # as a missing prediction must not count as a wrong one.
+        if len(text_indices) == 0:
+            return None
+        matrix = np.full(
+            (len(self._results.detector_names), text_indices.max() + 1),
+            np.nan,
+            dtype=np.float64,
+        )
+        matrix[detectors, text_indices] = correct
+        is_complete = ~np.isnan(matrix).any(axis=0)
+        self.incomplete_text_count += int(
+            np.count_nonzero(~is_complete & ~np.isnan(matrix).all(axis=0))
+        )
+        if not is_complete.any():
+            return None
+        return matrix[:, is_complete]
+
+    def _resample_accuracies(self, matrix: np.ndarray) -> np.ndarray:
+        # Instead of gathering resampled texts, each resample is expressed as a
+        # vector of how often every text has been drawn. All resampled accuracies
+        # of all detectors are then computed with a single matrix product.
+        resample_count = self._resample_count
+        text_count = matrix.shape[1]
+        indices = self._rng.integers(0, text_count, size=(resample_count, text_count))
+        offsets = np.arange(resample_count)[:, np.newaxis] * text_count
+        weights = np.bincount(
+            (indices + offsets).ravel(), minlength=resample_count * text_count
+        ).reshape(resample_count, text_count)
+        return (weights @ matrix.T) / text_count
+
+    def _compute_confidence_intervals(
+        self,
+        category: Category,
+        language_name: str,
+        detector_names: list[str],
+        observed_accuracies: np.ndarray,
+        resampled_accuracies: np.ndarray,
+    ) -> list[dict]:
+        alpha = 1 - self._confidence_level
+        lower, upper = np.quantile(
+            resampled_accuracies, [alpha / 2, 1 - alpha / 2], axis=0
+        )
+        return [
+            {
+                "category": category.folder_name(),
+                "language": language_name,
+                "detector": detector_name,
+                "accuracy": observed_accuracies[idx] * 100,
+                "ci_lower": lower[idx] * 100,
+                "ci_upper": upper[idx] * 100,
+            }
+            for idx, detector_name in enumerate(detector_names)
+        ]
+
+    def _compute_paired_tests(
+        self,
+        category: Category,
+        language_name: str,
+        detector_names: list[str],
+        observed_accuracies: np.ndarray,
+        resampled_accuracies: np.ndarray,
+    ) -> list[dict]:
+        first, second = np.triu_indices(len(detector_names), k=1)
+        observed_differences = observed_accuracies[first] - observed_accuracies[second]
+        resampled_differences = (
+            resampled_accuracies[:, first] - resampled_accuracies[:, second]
+        )
+
+        # Two-sided p-value of the paired bootstrap: how often the resampled
+        # difference lies on the other side of zero than the observed one
+        sign = np.where(observed_differences >= 0, 1.0, -1.0)
+        p_values = np.minimum(
+            2 * np.mean(resampled_differences * sign <= 0, axis=0), 1.0
+        )
+        p_values[observed_differences == 0] = 1.0
+
+        alpha = 1 - self._confidence_level
+        lower, upper = np.quantile(
+            resampled_differences, [alpha / 2, 1 - alpha / 2], axis=0
+        )
+
+        return [
+            {
+                "category": category.folder_name(),
+                "language": language_name,
+                "detector": detector_names[first[idx]],
+                "other_detector": detector_names[second[idx]],
+                "difference": observed_differences[idx] * 100,
+                "ci_lower": lower[idx] * 100,
+                "ci_upper": upper[idx] * 100,
+                "p_value": p_values[idx],
+                "significant": bool(p_values[idx] < alpha),
+            }
+            for idx in range(len(first))
+        ]
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--detectors",
+        nargs="+",
+        help="detectors whose stored predictions are compared "
+        "(default: all except the single language detectors)",
+    )
+    parser.add_argument("--resamples", type=int, default=2000)
+    parser.add_argument("--confidence-level", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_command_line_args()
+    detector_names = args.detectors
+    if detector_names is None:
+        detector_names = sorted(
+            file_path.stem
+            for file_path in get_results_directory().glob("*.npz")
+            if not file_path.stem.endswith("-detector")
+        )
+        if len(detector_names) == 0:
+            sys.exit(
+                f"No stored predictions found in {get_results_directory().resolve()}, "
+                "run the accuracy reporter first"
+            )
+
+    try:
+        results = PredictionResults.load_detectors(detector_names)
+    except FileNotFoundError as error:
+        sys.exit(f"No stored predictions found: {error.filename}")
+
+    start = time.perf_counter()
+    tester = AccuracySignificanceTester(
+        results=results,
+        resample_count=args.resamples,
+        confidence_level=args.confidence_level,
+        seed=args.seed,
+    )
+    confidence_intervals, paired_tests = tester.run()
+    if tester.incomplete_text_count > 0:
+        print(
+            f"{tester.incomplete_text_count} test units without predictions "
+            "of all detectors have been left out"
+        )
+    if len(tester.skipped_units) > 0:
+        print(
+            f"{len(tester.skipped_units)} test data files without predictions of all "
+            "detectors have been skipped: "
+            + ", ".join(
+                f"{language_name} ({category_name})"
+                for language_name, category_name in tester.skipped_units
+            )
+        )
+    if len(confidence_intervals) == 0:
+        sys.exit("The detectors do not have predictions for any common test data file")
+
+    report_directory_path = Path(__file__).parent / "../accuracy-reports/significance"
+    report_directory_path.mkdir(parents=True, exist_ok=True)
+    confidence_intervals.to_csv(
+        report_directory_path / "confidence-intervals.csv", index=False
+    )
+    paired_tests.to_csv(report_directory_path / "paired-tests.csv", index=False)
+    stop = time.perf_counter()
+
+    print(f"All significance tests computed successfully in {stop - start:.2f} seconds")
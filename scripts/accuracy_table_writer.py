@@ -13,12 +13,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import math
+import numpy as np
 import pandas as pd
 
-from lingua import Language
+from accuracy_report_data import (
+    ReportOutput,
+    get_report_file_path,
+    prefixes,
+    read_accuracy_report,
+)
 from pathlib import Path
 
+_image_url = "https://raw.githubusercontent.com/pemistahl/lingua-py/main/images"
+
 
 class AccuracyTableWriter:
     _column_labels = {
@@ -31,16 +38,37 @@ class AccuracyTableWriter:
         "lingua-single-language-detector": "Lingua<br>(single language mode)",
         "simplemma": "Simplemma",
     }
-
-    def __init__(self, table_title: str, report_file_path: Path):
+    # The upper bound of the accuracy values of each color
+    _square_colors = (
+        (20, "red"),
+        (40, "orange"),
+        (60, "yellow"),
+        (80, "lightgreen"),
+        (100, "green"),
+    )
+
+    def __init__(self, table_title: str, accuracy_report: pd.DataFrame):
         self._table_title = table_title
-        self._dataframe = self._read_into_dataframe(report_file_path)
+        self._dataframe = accuracy_report[list(self._column_labels)]
 
     def write_accuracy_table(self, file_path: Path):
         mean = self._dataframe.mean().round()
         median = self._dataframe.median().round(2)
         std = self._dataframe.std().round(2)
 
+        # All cells are formatted at once instead of looking up each of them
+        rounded_values = self._dataframe.round()
+        accuracy_strings = rounded_values.astype("Int64").astype(str)
+        accuracy_strings = accuracy_strings.mask(rounded_values.isna(), "-")
+        colors = self._get_square_colors(rounded_values.to_numpy())
+        cells = (
+            f'        <td><img src="{_image_url}/'
+            + colors
+            + '.png"> '
+            + accuracy_strings.to_numpy()
+            + "</td>\n"
+        )
+
         colspan = len(self._column_labels)
         table = f"""<table>
     <tr>
@@ -56,44 +84,29 @@ class AccuracyTableWriter:
 
         table += "</tr>\n    <tr>\n"
 
-        for language in self._dataframe.index:
-            language_data = self._dataframe.loc[language]
+        for language, language_cells in zip(self._dataframe.index, cells):
             table += f"        <td>{language}</td>\n"
-
-            for column in self._column_labels.keys():
-                accuracy_value = language_data.loc[[column]].iloc[0]
-                if not math.isnan(accuracy_value):
-                    accuracy_value = int(round(accuracy_value))
-                    accuracy_str = str(accuracy_value)
-                else:
-                    accuracy_str = "-"
-
-                color = self._get_square_color(accuracy_value)
-                table += f'        <td><img src="https://raw.githubusercontent.com/pemistahl/lingua-py/main/images/{color}.png"> {accuracy_str}</td>\n'
-
+            table += "".join(language_cells)
             table += "    </tr>\n"
 
         table += f'    <tr>\n        <td colspan="{colspan}"></td>\n    </tr>\n'
         table += "    <tr>\n        <td><strong>Mean</strong></td>\n"
 
-        for column in self._column_labels.keys():
-            accuracy_value = mean.loc[[column]].iloc[0]
+        for accuracy_value in mean:
             color = self._get_square_color(accuracy_value)
-            table += f'        <td><img src="https://raw.githubusercontent.com/pemistahl/lingua-py/main/images/{color}.png"> <strong>{accuracy_value}</strong></td>\n'
+            table += f'        <td><img src="{_image_url}/{color}.png"> <strong>{accuracy_value}</strong></td>\n'
 
         table += "    </tr>\n"
         table += f'    <tr>\n        <td colspan="{colspan}"></td>\n    </tr>\n'
         table += "    <tr>\n        <td>Median</td>\n"
 
-        for column in self._column_labels.keys():
-            accuracy_value = median.loc[[column]].iloc[0]
+        for accuracy_value in median:
             table += f"        <td>{accuracy_value}</td>\n"
 
         table += "    </tr>\n"
         table += "    <tr>\n        <td>Standard Deviation</td>\n"
 
-        for column in self._column_labels.keys():
-            accuracy_value = std.loc[[column]].iloc[0]
+        for accuracy_value in std:
             table += f"        <td>{accuracy_value}</td>\n"
 
         table += "    </tr>\n"
@@ -102,54 +115,56 @@ class AccuracyTableWriter:
         with open(file_path, mode="w") as accuracy_table_file:
             accuracy_table_file.write(table)
 
-    def _read_into_dataframe(self, report_file_path: Path) -> pd.DataFrame:
-        df = pd.read_csv(report_file_path, index_col="language")
-
-        single_language_mode_columns = [
-            f"lingua-{language.name.lower()}-detector" for language in Language.all()
-        ]
-        merged_single_language_mode_column = {
-            "lingua-single-language-detector": df[single_language_mode_columns].mean(
-                axis="columns"
-            )
-        }
-        df = df.assign(**merged_single_language_mode_column).drop(
-            single_language_mode_columns, axis="columns"
+    def _get_square_colors(self, accuracy_values: np.ndarray) -> np.ndarray:
+        invalid_values = ~np.isnan(accuracy_values) & (
+            (accuracy_values < 0) | (accuracy_values > 100)
         )
-
-        return df
+        if invalid_values.any():
+            raise ValueError(
+                "invalid accuracy value:", accuracy_values[invalid_values][0]
+            )
+        conditions = [np.isnan(accuracy_values)] + [
+            accuracy_values <= upper_bound for upper_bound, _ in self._square_colors
+        ]
+        colors = ["grey"] + [color for _, color in self._square_colors]
+        return np.select(conditions, colors, default="green").astype(object)
 
     def _get_square_color(self, accuracy_value: float) -> str:
-        if math.isnan(accuracy_value):
-            return "grey"
-        elif 0 <= accuracy_value <= 20:
-            return "red"
-        elif 21 <= accuracy_value <= 40:
-            return "orange"
-        elif 41 <= accuracy_value <= 60:
-            return "yellow"
-        elif 61 <= accuracy_value <= 80:
-            return "lightgreen"
-        elif 81 <= accuracy_value <= 100:
-            return "green"
-        else:
-            raise ValueError("invalid accuracy value:", accuracy_value)
+        return self._get_square_colors(np.array([accuracy_value]))[0]
+
+
+def get_table_file_path(prefix: str) -> Path:
+    table_file_name = prefix.upper().replace("-", "_")
+    return Path(__file__).parent / f"../tables/{table_file_name}_ACCURACY_TABLE.md"
+
+
+def write_table(prefix: str, accuracy_report: pd.DataFrame):
+    table_title = prefix.title().replace("-", " ")
+    writer = AccuracyTableWriter(
+        table_title=f"{table_title} Detection Performance",
+        accuracy_report=accuracy_report,
+    )
+    writer.write_accuracy_table(file_path=get_table_file_path(prefix))
+
+
+def get_table_outputs(selected_prefixes: list[str]) -> list[ReportOutput]:
+    return [
+        ReportOutput(
+            prefix=prefix,
+            file_path=get_table_file_path(prefix),
+            code_file_paths=[
+                Path(__file__),
+                Path(__file__).parent / "accuracy_report_data.py",
+            ],
+            build=write_table,
+            runs_in_worker=False,
+        )
+        for prefix in selected_prefixes
+    ]
 
 
 if __name__ == "__main__":
-    report_directory_path = Path(__file__).parent / "../accuracy-reports"
-    table_directory_path = Path(__file__).parent / "../tables"
-    prefixes = ("average", "single-words", "word-pairs", "sentences")
-
     for prefix in prefixes:
-        table_title = prefix.title().replace("-", " ")
-        table_file_name = prefix.upper().replace("-", "_")
-        writer = AccuracyTableWriter(
-            table_title=f"{table_title} Detection Performance",
-            report_file_path=report_directory_path / f"{prefix}-accuracy-values.csv",
-        )
-        writer.write_accuracy_table(
-            file_path=table_directory_path / f"{table_file_name}_ACCURACY_TABLE.md"
-        )
+        write_table(prefix, read_accuracy_report(get_report_file_path(prefix)))
 
     print("All accuracy tables created successfully")
@@ -0,0 +1,241 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import pandas as pd
+import time
+
+from lingua import ConfidenceValue, Language, LanguageDetector, LanguageDetectorBuilder
+from pathlib import Path
+from test_data_corpus import TestDataCorpus, test_data_categories
+from typing import Callable, Optional
+
+
+class AdaptiveLanguageDetector:
+    # Texts of at least min_text_length characters are classified in low accuracy
+    # mode first. Only if the distance between the two most likely languages is
+    # smaller than min_confidence_margin, they are classified again in high
+    # accuracy mode. Shorter texts are sent to high accuracy mode right away.
+    def __init__(
+        self,
+        low_accuracy_detector: LanguageDetector,
+        high_accuracy_detector: LanguageDetector,
+        min_text_length: int = 120,
+        min_confidence_margin: float = 0.1,
+    ):
+        self._low_accuracy_detector = low_accuracy_detector
+        self._high_accuracy_detector = high_accuracy_detector
+        self._min_text_length = min_text_length
+        self._min_confidence_margin = min_confidence_margin
+        self.routing_counts = {"low_accuracy": 0, "short_text": 0, "low_margin": 0}
+
+    def detect_language_of(self, text: str) -> Optional[Language]:
+        return self.detect_languages_in_parallel_of([text])[0]
+
+    def detect_languages_in_parallel_of(
+        self, texts: list[str]
+    ) -> list[Optional[Language]]:
+        return self._route(
+            texts,
+            lambda confidence_values: confidence_values[0].language,
+            self._high_accuracy_detector.detect_languages_in_parallel_of,
+        )
+
+    def compute_language_confidence_values(self, text: str) -> list[ConfidenceValue]:
+        return self.compute_language_confidence_values_in_parallel([text])[0]
+
+    def compute_language_confidence_values_in_parallel(
+        self, texts: list[str]
+    ) -> list[list[ConfidenceValue]]:
+        return self._route(
+            texts,
+            lambda confidence_values: confidence_values,
+            self._high_accuracy_detector.compute_language_confidence_values_in_parallel,
+        )
+
+    def _route(
+        self,
+        texts: list[str],
+        convert_low_accuracy_result: Callable[[list[ConfidenceValue]], object],
+        detect_in_high_accuracy_mode: Callable[[list[str]], list],
+    ) -> list:
+        results: list = [None] * len(texts)
+        long_positions = [
+            position
+            for position, text in enumerate(texts)
+            if len(text) >= self._min_text_length
+        ]
+        long_position_set = set(long_positions)
+        escalated_positions = [
+            position
+            for position in range(len(texts))
+            if position not in long_position_set
+        ]
+        self.routing_counts["short_text"] += len(escalated_positions)
+
+        # Each group of texts is classified with a single multi-threaded call
+        if len(long_positions) > 0:
+            low_accuracy_detector = self._low_accuracy_detector
+            all_confidence_values = (
+                low_accuracy_detector.compute_language_confidence_values_in_parallel(
+                    [texts[position] for position in long_positions]
+                )
+            )
+            for position, confidence_values in zip(
+                long_positions, all_confidence_values
+            ):
+                # Texts without any letters have no or only zero confidence
+                # values, they are escalated regardless of the minimum margin
+                if (
+                    len(confidence_values) == 0
+                    or confidence_values[0].value == 0
+                    or self.compute_margin(confidence_values)
+                    < self._min_confidence_margin
+                ):
+                    escalated_positions.append(position)
+                    self.routing_counts["low_margin"] += 1
+                else:
+                    results[position] = convert_low_accuracy_result(confidence_values)
+                    self.routing_counts["low_accuracy"] += 1
+
+        if len(escalated_positions) > 0:
+            escalated_results = detect_in_high_accuracy_mode(
+                [texts[position] for position in escalated_positions]
+            )
+            for position, result in zip(escalated_positions, escalated_results):
+                results[position] = result
+
+        return results
+
+    @staticmethod
+    def compute_margin(confidence_values: list[ConfidenceValue]) -> float:
+        if len(confidence_values) == 0:
+            return 0.0
+        if len(confidence_values) == 1:
+            return confidence_values[0].value
+        return confidence_values[0].value - confidence_values[1].value
+
+
+def evaluate_detector(
+    detect_in_parallel: Callable[[list[str]], list[Optional[Language]]],
+    texts_per_language: dict[Language, list[str]],
+) -> tuple[float, float, int]:
+    all_texts = [text for texts in texts_per_language.values() for text in texts]
+    start = time.perf_counter()
+    detected_languages = detect_in_parallel(all_texts)
+    seconds = time.perf_counter() - start
+
+    # The accuracy is averaged over languages, as in the accuracy reports
+    accuracies = []
+    offset = 0
+    for language, texts in texts_per_language.items():
+        correct = sum(
+            1
+            for detected_language in detected_languages[offset : offset + len(texts)]
+            if detected_language == language
+        )
+        accuracies.append(correct / len(texts) if len(texts) > 0 else np.nan)
+        offset += len(texts)
+
+    return float(np.nanmean(accuracies)), seconds, len(all_texts)
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    default_languages = [language.name.lower() for language in Language.all()]
+    parser = argparse.ArgumentParser(
+        description="Compare accuracy and throughput of adaptive routing "
+        "with low and high accuracy mode for each test data category"
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=default_languages,
+        default=default_languages,
+    )
+    parser.add_argument("--min-text-length", type=int, default=120)
+    parser.add_argument("--min-confidence-margin", type=float, default=0.1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    languages = sorted(
+        [Language.from_str(name) for name in args.languages],
+        key=lambda language: language.name,
+    )
+    low_accuracy_detector = (
+        LanguageDetectorBuilder.from_all_languages()
+        .with_low_accuracy_mode()
+        .with_preloaded_language_models()
+        .build()
+    )
+    high_accuracy_detector = (
+        LanguageDetectorBuilder.from_all_languages()
+        .with_preloaded_language_models()
+        .build()
+    )
+    corpus = TestDataCorpus.load()
+    rows = []
+
+    for category in test_data_categories:
+        texts_per_language = {
+            language: corpus.get_texts(language, category) for language in languages
+        }
+        adaptive_detector = AdaptiveLanguageDetector(
+            low_accuracy_detector,
+            high_accuracy_detector,
+            args.min_text_length,
+            args.min_confidence_margin,
+        )
+        detectors = {
+            "lingua-low-accuracy": low_accuracy_detector.detect_languages_in_parallel_of,
+            "lingua-high-accuracy": high_accuracy_detector.detect_languages_in_parallel_of,
+            "lingua-adaptive-accuracy": adaptive_detector.detect_languages_in_parallel_of,
+        }
+
+        for detector_name, detect_in_parallel in detectors.items():
+            print(f"Evaluating {detector_name} on {category.folder_name()}...")
+            accuracy, seconds, text_count = evaluate_detector(
+                detect_in_parallel, texts_per_language
+            )
+            rows.append(
+                {
+                    "category": category.folder_name(),
+                    "detector": detector_name,
+                    "accuracy": accuracy * 100,
+                    "seconds": seconds,
+                    "texts_per_second": text_count / seconds,
+                }
+            )
+
+        routed_count = sum(adaptive_detector.routing_counts.values())
+        rows[-1]["high_accuracy_share"] = (
+            100 * (routed_count - adaptive_detector.routing_counts["low_accuracy"])
+        ) / max(routed_count, 1)
+
+    results = pd.DataFrame(rows).set_index(["category", "detector"])
+    print(results.to_string(float_format="{:.2f}".format))
+
+    report_file_path = (
+        Path(__file__).parent / "../accuracy-reports/adaptive-accuracy-mode-metrics.csv"
+    )
+    results.to_csv(report_file_path, na_rep="NaN")
+
+    print(f"Adaptive accuracy mode metrics written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
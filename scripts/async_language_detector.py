@@ -0,0 +1,276 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import numpy as np
+import time
+
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from lingua import (
+    ConfidenceValue,
+    DetectionResult,
+    Language,
+    LanguageDetector,
+    LanguageDetectorBuilder,
+)
+from test_data_corpus import Category, TestDataCorpus
+from typing import Any, Callable, Optional
+
+
+class MicroBatchingMetrics:
+    # Only the most recent latencies are kept for the percentiles,
+    # so memory usage stays constant for long-running services
+    def __init__(self, max_samples: int = 10000):
+        self.request_count = 0
+        self.batch_count = 0
+        self.max_batch_size = 0
+        self._detection_seconds = 0.0
+        self._latencies: deque[float] = deque(maxlen=max_samples)
+        self._batch_sizes: deque[int] = deque(maxlen=max_samples)
+
+    def record_batch(self, latencies: list[float], detection_seconds: float):
+        self.request_count += len(latencies)
+        self.batch_count += 1
+        self.max_batch_size = max(self.max_batch_size, len(latencies))
+        self._detection_seconds += detection_seconds
+        self._latencies.extend(latencies)
+        self._batch_sizes.append(len(latencies))
+
+    def to_dict(self) -> dict[str, Any]:
+        metrics: dict[str, Any] = {
+            "requests": self.request_count,
+            "batches": self.batch_count,
+            "max_batch_size": self.max_batch_size,
+            "mean_batch_size": (
+                float(np.mean(self._batch_sizes)) if self._batch_sizes else 0.0
+            ),
+            "detection_seconds": round(self._detection_seconds, 6),
+        }
+        percentiles = (50, 95, 99)
+        values = (
+            np.percentile(self._latencies, percentiles) * 1000
+            if self._latencies
+            else np.zeros(len(percentiles))
+        )
+        for percentile, value in zip(percentiles, values):
+            metrics[f"latency_p{percentile}_ms"] = round(float(value), 3)
+        return metrics
+
+
+class _MicroBatcher:
+    def __init__(
+        self,
+        detect_batch: Callable[[list[str]], list],
+        max_batch_size: int,
+        max_wait_seconds: float,
+        executor: Executor,
+        metrics: MicroBatchingMetrics,
+    ):
+        self._detect_batch = detect_batch
+        self._max_batch_size = max_batch_size
+        self._max_wait_seconds = max_wait_seconds
+        self._executor = executor
+        self._metrics = metrics
+        self._pending: list[tuple[str, asyncio.Future, float]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._running_batches: set[asyncio.Task] = set()
+
+    async def submit(self, text: str) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+
+        if len(self._pending) >= self._max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self._max_wait_seconds, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if len(self._pending) == 0:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._running_batches.add(task)
+        task.add_done_callback(self._running_batches.discard)
+
+    async def _run_batch(self, batch: list[tuple[str, asyncio.Future, float]]):
+        try:
+            await self._resolve_batch(batch)
+        finally:
+            # If the batch task is cancelled, e.g. when the event loop shuts down,
+            # its callers are cancelled as well instead of waiting forever
+            for _, future, _ in batch:
+                if not future.done():
+                    future.cancel()
+
+    async def _resolve_batch(self, batch: list[tuple[str, asyncio.Future, float]]):
+        texts = [text for text, _, _ in batch]
+        loop = asyncio.get_running_loop()
+        try:
+            results, detection_seconds = await loop.run_in_executor(
+                self._executor, self._detect_timed, texts
+            )
+        except Exception as error:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        stop = time.perf_counter()
+        for (_, future, _), result in zip(batch, results):
+            # Callers that have been cancelled in the meantime are skipped
+            if not future.done():
+                future.set_result(result)
+
+        self._metrics.record_batch(
+            [stop - enqueued for _, _, enqueued in batch], detection_seconds
+        )
+
+    def _detect_timed(self, texts: list[str]) -> tuple[list, float]:
+        # The time is measured in the executor, so that waiting
+        # for a previous batch to finish is not counted
+        start = time.perf_counter()
+        results = self._detect_batch(texts)
+        return results, time.perf_counter() - start
+
+    async def close(self):
+        self._flush()
+        if self._running_batches:
+            await asyncio.gather(*self._running_batches)
+
+
+class AsyncLanguageDetector:
+    # Concurrent callers are collected for at most max_wait_seconds or until
+    # max_batch_size texts are pending. Each batch is then classified with one
+    # call of a multi-threaded method outside of the event loop. Batches run
+    # one after another by default, as each of them uses all cores already.
+    def __init__(
+        self,
+        detector: LanguageDetector,
+        max_batch_size: int = 256,
+        max_wait_seconds: float = 0.002,
+        executor: Optional[Executor] = None,
+    ):
+        self._owns_executor = executor is None
+        self._executor = (
+            executor if executor is not None else ThreadPoolExecutor(max_workers=1)
+        )
+        self.metrics = {
+            name: MicroBatchingMetrics()
+            for name in (
+                "detect_language_of",
+                "compute_language_confidence_values",
+                "detect_multiple_languages_of",
+            )
+        }
+        self._batchers = {
+            name: _MicroBatcher(
+                detect_batch,
+                max_batch_size,
+                max_wait_seconds,
+                self._executor,
+                self.metrics[name],
+            )
+            for name, detect_batch in (
+                ("detect_language_of", detector.detect_languages_in_parallel_of),
+                (
+                    "compute_language_confidence_values",
+                    detector.compute_language_confidence_values_in_parallel,
+                ),
+                (
+                    "detect_multiple_languages_of",
+                    detector.detect_multiple_languages_in_parallel_of,
+                ),
+            )
+        }
+
+    async def detect_language_of(self, text: str) -> Optional[Language]:
+        return await self._batchers["detect_language_of"].submit(text)
+
+    async def compute_language_confidence_values(
+        self, text: str
+    ) -> list[ConfidenceValue]:
+        return await self._batchers["compute_language_confidence_values"].submit(text)
+
+    async def detect_multiple_languages_of(self, text: str) -> list[DetectionResult]:
+        return await self._batchers["detect_multiple_languages_of"].submit(text)
+
+    def get_metrics(self) -> dict[str, dict[str, Any]]:
+        return {name: metrics.to_dict() for name, metrics in self.metrics.items()}
+
+    async def close(self):
+        for batcher in self._batchers.values():
+            await batcher.close()
+        if self._owns_executor:
+            self._executor.shutdown(wait=True)
+
+
+async def compare_with_unbatched_calls(
+    detector: LanguageDetector, texts: list[str], args: argparse.Namespace
+):
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(asyncio.to_thread(detector.detect_language_of, text) for text in texts)
+    )
+    stop = time.perf_counter()
+    print(f"Unbatched: {len(texts) / (stop - start):.0f} texts per second")
+
+    async_detector = AsyncLanguageDetector(
+        detector,
+        max_batch_size=args.max_batch_size,
+        max_wait_seconds=args.max_wait_ms / 1000,
+    )
+    start = time.perf_counter()
+    await asyncio.gather(*(async_detector.detect_language_of(text) for text in texts))
+    stop = time.perf_counter()
+    await async_detector.close()
+    print(f"Micro-batched: {len(texts) / (stop - start):.0f} texts per second")
+    print(async_detector.get_metrics()["detect_language_of"])
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare concurrent unbatched detector calls "
+        "with the micro-batching asyncio adapter"
+    )
+    parser.add_argument("--requests", type=int, default=10000)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_command_line_args()
+    detector = (
+        LanguageDetectorBuilder.from_all_languages()
+        .with_preloaded_language_models()
+        .build()
+    )
+    corpus = TestDataCorpus.load()
+    texts = [
+        text
+        for language in sorted(Language.all(), key=lambda language: language.name)
+        for text in corpus.get_texts(language, Category.SENTENCES)
+    ][: args.requests]
+
+    asyncio.run(compare_with_unbatched_calls(detector, texts, args))
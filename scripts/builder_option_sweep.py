@@ -0,0 +1,317 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import itertools
+import matplotlib
+import matplotlib.pyplot as plt
+import multiprocessing
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+from memory_monitor import PeakMemoryMonitor
+from pathlib import Path
+from prediction_results import PredictionResults
+from test_data_corpus import Category, TestDataCorpus, test_data_categories
+from typing import Any, Optional
+
+matplotlib.use("Agg")
+sns.set()
+sns.set_style("whitegrid")
+
+_accuracy_modes = ("high", "low")
+_loading_modes = ("lazy", "preloaded")
+
+_language_sets = {
+    "all": ("from_all_languages", Language.all),
+    "arabic-script": (
+        "from_all_languages_with_arabic_script",
+        Language.all_with_arabic_script,
+    ),
+    "cyrillic-script": (
+        "from_all_languages_with_cyrillic_script",
+        Language.all_with_cyrillic_script,
+    ),
+    "devanagari-script": (
+        "from_all_languages_with_devanagari_script",
+        Language.all_with_devanagari_script,
+    ),
+    "latin-script": (
+        "from_all_languages_with_latin_script",
+        Language.all_with_latin_script,
+    ),
+}
+
+
+@dataclass
+class BuilderConfiguration:
+    _accuracy_mode: str
+    _minimum_relative_distance: float
+    _loading_mode: str
+    _language_set: str
+
+    def build(self) -> LanguageDetector:
+        builder_method_name, _ = _language_sets[self._language_set]
+        builder = getattr(LanguageDetectorBuilder, builder_method_name)()
+        if self._accuracy_mode == "low":
+            builder = builder.with_low_accuracy_mode()
+        if self._minimum_relative_distance > 0:
+            builder = builder.with_minimum_relative_distance(
+                self._minimum_relative_distance
+            )
+        if self._loading_mode == "preloaded":
+            builder = builder.with_preloaded_language_models()
+        return builder.build()
+
+    def get_languages(self) -> list[Language]:
+        _, get_languages = _language_sets[self._language_set]
+        return sorted(get_languages(), key=lambda language: language.name)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "language_set": self._language_set,
+            "accuracy_mode": self._accuracy_mode,
+            "minimum_relative_distance": self._minimum_relative_distance,
+            "loading_mode": self._loading_mode,
+        }
+
+
+def measure_configuration(
+    configuration: BuilderConfiguration,
+    max_text_count: Optional[int],
+    use_multiple_threads: bool,
+) -> dict[str, Any]:
+    corpus = TestDataCorpus.load()
+    all_results = []
+    text_count = 0
+    detection_seconds = 0.0
+
+    with PeakMemoryMonitor() as monitor:
+        start = time.perf_counter()
+        detector = configuration.build()
+        build_seconds = time.perf_counter() - start
+
+        for category in test_data_categories:
+            for language in configuration.get_languages():
+                texts = corpus.get_texts(language, category)[:max_text_count]
+                start = time.perf_counter()
+                detected_languages = (
+                    detector.detect_languages_in_parallel_of(texts)
+                    if use_multiple_threads
+                    else [detector.detect_language_of(text) for text in texts]
+                )
+                detection_seconds += time.perf_counter() - start
+                text_count += len(texts)
+                all_results.append(
+                    PredictionResults.from_detected_languages(
+                        "sweep",
+                        language,
+                        category,
+                        language,
+                        detected_languages,
+                        texts,
+                    )
+                )
+
+    # The accuracies are computed per language and category as in the
+    # accuracy reports and then averaged over all languages
+    counts = PredictionResults.concat(all_results).count_predictions()
+    accuracies = pd.Series(counts.compute_accuracies()).groupby(counts.category).mean()
+    category_accuracies = {
+        category: accuracies[category.value] * 100 for category in test_data_categories
+    }
+    category_accuracies[Category.AVERAGE] = float(
+        np.mean(list(category_accuracies.values()))
+    )
+
+    return {
+        **configuration.to_dict(),
+        **{
+            f"{category.folder_name()}_accuracy": category_accuracies[category]
+            for category in Category
+        },
+        "build_seconds": build_seconds,
+        "detection_seconds": detection_seconds,
+        "texts_per_second": text_count / detection_seconds,
+        "peak_rss_mb": monitor.peak_rss / 1024**2,
+    }
+
+
+def find_pareto_optimal(accuracies: np.ndarray, throughputs: np.ndarray) -> np.ndarray:
+    # A configuration is Pareto-optimal if no other configuration
+    # is at least as accurate and as fast and better in one of both
+    is_dominated = (
+        (accuracies[np.newaxis, :] >= accuracies[:, np.newaxis])
+        & (throughputs[np.newaxis, :] >= throughputs[:, np.newaxis])
+        & (
+            (accuracies[np.newaxis, :] > accuracies[:, np.newaxis])
+            | (throughputs[np.newaxis, :] > throughputs[:, np.newaxis])
+        )
+    )
+    return np.asarray(~is_dominated.any(axis=1))
+
+
+def draw_pareto_plot(results: pd.DataFrame, file_path: Path):
+    plt.figure(figsize=(12, 8))
+    axes = sns.scatterplot(
+        data=results,
+        x="texts_per_second",
+        y="average_accuracy",
+        hue="language_set",
+        style="accuracy_mode",
+        size="peak_rss_mb",
+        sizes=(50, 400),
+    )
+
+    for _, group in results[results["pareto_optimal"]].groupby("language_set"):
+        frontier = group.sort_values("texts_per_second")
+        axes.plot(
+            frontier["texts_per_second"],
+            frontier["average_accuracy"],
+            color="#474747",
+            linestyle="--",
+            linewidth=1,
+        )
+        for _, row in frontier.iterrows():
+            axes.annotate(
+                f"{row['accuracy_mode']}, {row['loading_mode']}, "
+                f"d={row['minimum_relative_distance']}",
+                (row["texts_per_second"], row["average_accuracy"]),
+                textcoords="offset points",
+                xytext=(5, 5),
+                fontsize=8,
+            )
+
+    axes.set_xscale("log")
+    axes.set_xlabel("Texts per second")
+    axes.set_ylabel("Average accuracy in %")
+    axes.set_title("Accuracy versus throughput of LanguageDetectorBuilder options")
+    axes.legend(loc="center left", bbox_to_anchor=(1, 0.5))
+    plt.tight_layout()
+    plt.savefig(file_path, dpi=80)
+    plt.close()
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure accuracy, throughput and peak memory usage "
+        "for a grid of LanguageDetectorBuilder options"
+    )
+    parser.add_argument(
+        "--accuracy-modes",
+        nargs="+",
+        choices=_accuracy_modes,
+        default=list(_accuracy_modes),
+    )
+    parser.add_argument(
+        "--minimum-relative-distances",
+        nargs="+",
+        type=float,
+        default=[0.0, 0.1, 0.25],
+    )
+    parser.add_argument(
+        "--loading-modes",
+        nargs="+",
+        choices=_loading_modes,
+        default=list(_loading_modes),
+    )
+    parser.add_argument(
+        "--language-sets",
+        nargs="+",
+        choices=list(_language_sets),
+        default=["all"],
+    )
+    parser.add_argument(
+        "--max-texts",
+        type=int,
+        help="maximum number of texts per language and category (default: all)",
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="use the multi-threaded methods of Lingua",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    configurations = [
+        BuilderConfiguration(*options)
+        for options in itertools.product(
+            args.accuracy_modes,
+            args.minimum_relative_distances,
+            args.loading_modes,
+            args.language_sets,
+        )
+    ]
+    rows = []
+
+    for idx, configuration in enumerate(configurations, start=1):
+        print(f"Measuring configuration {idx}/{len(configurations)}: {configuration}")
+
+        # Every configuration is measured in a freshly spawned process so that
+        # neither lazily loaded models nor peak memory usage carry over
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            rows.append(
+                executor.submit(
+                    measure_configuration,
+                    configuration,
+                    args.max_texts,
+                    args.parallel,
+                ).result()
+            )
+
+    results = pd.DataFrame(rows)
+
+    # Accuracies are only comparable between detectors for the same languages
+    results["pareto_optimal"] = False
+    for _, group in results.groupby("language_set"):
+        results.loc[group.index, "pareto_optimal"] = find_pareto_optimal(
+            group["average_accuracy"].to_numpy(),
+            group["texts_per_second"].to_numpy(),
+        )
+
+    results = results.sort_values(
+        ["language_set", "average_accuracy"], ascending=[True, False]
+    )
+    print(
+        results[results["pareto_optimal"]].to_string(
+            index=False, float_format="{:.2f}".format
+        )
+    )
+
+    report_file_path = (
+        Path(__file__).parent / "../accuracy-reports/builder-option-sweep-values.csv"
+    )
+    results.to_csv(report_file_path, index=False, na_rep="NaN")
+
+    plot_file_path = (
+        Path(__file__).parent / "../images/plots/pareto-builder-options.png"
+    )
+    draw_pareto_plot(results, plot_file_path)
+
+    print(f"Builder option sweep values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import gzip
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+from contextlib import ExitStack
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+from typing import IO, Iterator, Optional
+
+_gzip_magic_number = b"\x1f\x8b"
+_zstd_magic_number = b"\x28\xb5\x2f\xfd"
+
+
+def open_binary_input(file_name: str, exit_stack: ExitStack) -> IO[bytes]:
+    stream: io.BufferedReader = (
+        sys.stdin.buffer  # type: ignore
+        if file_name == "-"
+        else exit_stack.enter_context(open(file_name, mode="rb"))
+    )
+    magic_number = stream.peek(4)[:4]
+
+    if magic_number.startswith(_gzip_magic_number):
+        gzip_stream = gzip.GzipFile(fileobj=stream, mode="rb")
+        return exit_stack.enter_context(gzip_stream)  # type: ignore
+    if magic_number == _zstd_magic_number:
+        return exit_stack.enter_context(open_zstd_stream(stream))
+    return stream
+
+
+def open_zstd_stream(stream: IO[bytes]) -> IO[bytes]:
+    # Python 3.14 ships with zstd support,
+    # older versions need the optional zstandard package
+    try:
+        from compression import zstd  # type: ignore
+
+        return zstd.ZstdFile(stream, mode="rb")
+    except ImportError:
+        pass
+
+    try:
+        import zstandard
+    except ImportError:
+        raise SystemExit(
+            "Reading zstd-compressed input requires Python >= 3.14 "
+            "or the zstandard package"
+        )
+
+    return zstandard.ZstdDecompressor().stream_reader(stream)  # type: ignore
+
+
+def open_text_output(file_name: Optional[str], exit_stack: ExitStack) -> IO[str]:
+    if file_name is None or file_name == "-":
+        return sys.stdout
+    if file_name.endswith(".gz"):
+        return exit_stack.enter_context(
+            gzip.open(file_name, mode="wt", encoding="utf-8")
+        )
+    return exit_stack.enter_context(open(file_name, mode="w", encoding="utf-8"))
+
+
+class BulkLanguageDetector:
+    def __init__(
+        self,
+        detector: LanguageDetector,
+        input_format: str,
+        text_field: str,
+        chunk_size: int,
+        compute_confidence_values: bool,
+    ):
+        self._detector = detector
+        self._input_format = input_format
+        self._text_field = text_field
+        self._chunk_size = chunk_size
+        self._compute_confidence_values = compute_confidence_values
+        self.line_count = 0
+
+    def run(self, file_names: list[str], output: IO[str]):
+        # At most two chunks are buffered ahead of the detector,
+        # so memory usage does not depend on the size of the input
+        chunks: queue.Queue = queue.Queue(maxsize=2)
+        reader = threading.Thread(
+            target=self._read_chunks, args=(file_names, chunks), daemon=True
+        )
+        reader.start()
+
+        while True:
+            chunk = chunks.get()
+            if chunk is None:
+                break
+            if isinstance(chunk, BaseException):
+                raise chunk
+            records, texts = chunk
+            self._write_results(records, texts, output)
+            self.line_count += len(texts)
+
+        reader.join()
+
+    def _read_chunks(self, file_names: list[str], chunks: queue.Queue):
+        try:
+            records: list[Optional[dict]] = []
+            texts: list[str] = []
+
+            for record, text in self._read_records(file_names):
+                records.append(record)
+                texts.append(text)
+                if len(texts) == self._chunk_size:
+                    chunks.put((records, texts))
+                    records, texts = [], []
+
+            if len(texts) > 0:
+                chunks.put((records, texts))
+            chunks.put(None)
+
+        except BaseException as error:
+            chunks.put(error)
+
+    def _read_records(
+        self, file_names: list[str]
+    ) -> Iterator[tuple[Optional[dict], str]]:
+        for file_name in file_names:
+            with ExitStack() as exit_stack:
+                binary_stream = open_binary_input(file_name, exit_stack)
+                # The wrapper must not close stdin when it is garbage-collected
+                lines = io.TextIOWrapper(binary_stream, encoding="utf-8")
+                exit_stack.callback(lines.detach)
+                for line_number, line in enumerate(lines, start=1):
+                    line = line.rstrip("\r\n")
+                    if self._input_format == "jsonl":
+                        if len(line.strip()) == 0:
+                            continue
+                        try:
+                            record = json.loads(line)
+                        except json.JSONDecodeError as error:
+                            print(
+                                f"Skipping line {line_number} of {file_name}: "
+                                f"invalid JSON ({error.msg})",
+                                file=sys.stderr,
+                            )
+                            continue
+                        if not isinstance(record, dict):
+                            print(
+                                f"Skipping line {line_number} of {file_name}: "
+                                "not a JSON object",
+                                file=sys.stderr,
+                            )
+                            continue
+                        yield record, str(record.get(self._text_field) or "")
+                    else:
+                        yield None, line
+
+    def _write_results(
+        self, records: list[Optional[dict]], texts: list[str], output: IO[str]
+    ):
+        results: list[dict]
+        if self._compute_confidence_values:
+            all_confidence_values = (
+                self._detector.compute_language_confidence_values_in_parallel(texts)
+            )
+            results = [
+                {
+                    "confidence_values": {
+                        confidence.language.name: round(confidence.value, 4)
+                        for confidence in confidence_values
+                        if confidence.value > 0
+                    }
+                }
+                for confidence_values in all_confidence_values
+            ]
+        else:
+            results = [
+                {"language": language.name if language is not None else None}
+                for language in self._detector.detect_languages_in_parallel_of(texts)
+            ]
+
+        for record, text, result in zip(records, texts, results):
+            if record is None:
+                record = {"text": text}
+            record.update(result)
+            output.write(json.dumps(record, ensure_ascii=False))
+            output.write("\n")
+
+
+def build_detector(args: argparse.Namespace) -> LanguageDetector:
+    if args.languages is not None:
+        languages = [Language.from_str(name) for name in args.languages]
+        builder = LanguageDetectorBuilder.from_languages(*languages)
+    else:
+        builder = LanguageDetectorBuilder.from_all_languages()
+
+    if args.low_accuracy:
+        builder = builder.with_low_accuracy_mode()
+    if args.minimum_relative_distance > 0:
+        builder = builder.with_minimum_relative_distance(args.minimum_relative_distance)
+
+    return builder.with_preloaded_language_models().build()
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Detect the language of each line of large, optionally gzip- "
+        "or zstd-compressed text or JSONL files with constant memory usage"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["-"],
+        help="input files, '-' reads from stdin (default: stdin)",
+    )
+    parser.add_argument(
+        "--format",
+        choices=("text", "jsonl"),
+        default="text",
+        help="one text per line or one JSON object per line (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--text-field",
+        default="text",
+        help="field of the JSON objects holding the text (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--output", help="output file, '.gz' files are compressed (default: stdout)"
+    )
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument(
+        "--confidence-values",
+        action="store_true",
+        help="write all non-zero confidence values instead of the detected language",
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=[language.name.lower() for language in Language.all()],
+    )
+    parser.add_argument("--low-accuracy", action="store_true")
+    parser.add_argument("--minimum-relative-distance", type=float, default=0.0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    start = time.perf_counter()
+    bulk_detector = BulkLanguageDetector(
+        detector=build_detector(args),
+        input_format=args.format,
+        text_field=args.text_field,
+        chunk_size=args.chunk_size,
+        compute_confidence_values=args.confidence_values,
+    )
+
+    try:
+        with ExitStack() as exit_stack:
+            bulk_detector.run(args.files, open_text_output(args.output, exit_stack))
+    except BrokenPipeError:
+        # The reader of the output has exited, e.g. when piping into head.
+        # Python would fail again when flushing stdout at shutdown,
+        # so stdout is redirected to devnull first.
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, sys.stdout.fileno())
+        sys.exit(1)
+
+    stop = time.perf_counter()
+    print(
+        f"{bulk_detector.line_count} lines classified in {stop - start:.2f} seconds",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
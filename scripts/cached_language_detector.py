@@ -0,0 +1,262 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import pandas as pd
+import threading
+import time
+
+from collections import OrderedDict
+from lingua import ConfidenceValue, Language, LanguageDetector, LanguageDetectorBuilder
+from pathlib import Path
+from test_data_corpus import Category, TestDataCorpus
+from typing import Any, Callable, Hashable, Optional
+
+
+def normalize_text(text: str) -> str:
+    # Lingua ignores letter case and splits texts into words at whitespace,
+    # so texts that only differ in these respects share a cache entry
+    return " ".join(text.split()).lower()
+
+
+class ResultCache:
+    # A size-bounded LRU cache whose entries optionally expire after ttl_seconds.
+    # It can be shared by several detectors as the keys contain their configuration.
+    def __init__(self, max_size: int = 100_000, ttl_seconds: Optional[float] = None):
+        self._max_size = max_size
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hit_count = 0
+        self.miss_count = 0
+        self.eviction_count = 0
+
+    def get_many(self, keys: list[Hashable]) -> list[tuple[bool, Any]]:
+        now = time.monotonic()
+        found = []
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is not None and entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self.hit_count += 1
+                    found.append((True, entry[0]))
+                else:
+                    if entry is not None:
+                        del self._entries[key]
+                        self.eviction_count += 1
+                    self.miss_count += 1
+                    found.append((False, None))
+        return found
+
+    def put_many(self, items: list[tuple[Hashable, Any]]):
+        expiry = (
+            time.monotonic() + self._ttl_seconds
+            if self._ttl_seconds is not None
+            else float("inf")
+        )
+        with self._lock:
+            for key, value in items:
+                self._entries[key] = (value, expiry)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self._max_size:
+                self._entries.popitem(last=False)
+                self.eviction_count += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_statistics(self) -> dict[str, Any]:
+        with self._lock:
+            lookup_count = self.hit_count + self.miss_count
+            return {
+                "size": len(self._entries),
+                "hits": self.hit_count,
+                "misses": self.miss_count,
+                "evictions": self.eviction_count,
+                "hit_rate": self.hit_count / lookup_count if lookup_count > 0 else 0.0,
+            }
+
+
+class CachedLanguageDetector:
+    # Wraps the single-text and multi-threaded methods of a LanguageDetector.
+    # Batches are deduplicated before being dispatched, so every distinct text
+    # is classified at most once per call, and the results are mapped back to
+    # all positions of the input. Multiple-language detection is not cached,
+    # as its results refer to character indices of the original text.
+    def __init__(
+        self,
+        detector: LanguageDetector,
+        configuration: str,
+        cache: Optional[ResultCache] = None,
+    ):
+        self._detector = detector
+        self._configuration = configuration
+        self.cache = cache if cache is not None else ResultCache()
+
+    def detect_language_of(self, text: str) -> Optional[Language]:
+        return self.detect_languages_in_parallel_of([text])[0]
+
+    def detect_languages_in_parallel_of(
+        self, texts: list[str]
+    ) -> list[Optional[Language]]:
+        return self._lookup(
+            "detect_language_of", texts, self._detector.detect_languages_in_parallel_of
+        )
+
+    def compute_language_confidence_values(self, text: str) -> list[ConfidenceValue]:
+        return self.compute_language_confidence_values_in_parallel([text])[0]
+
+    def compute_language_confidence_values_in_parallel(
+        self, texts: list[str]
+    ) -> list[list[ConfidenceValue]]:
+        # The lists are copied, so that callers cannot modify the cached values
+        return [
+            list(confidence_values)
+            for confidence_values in self._lookup(
+                "compute_language_confidence_values",
+                texts,
+                self._detector.compute_language_confidence_values_in_parallel,
+            )
+        ]
+
+    def _lookup(
+        self,
+        method_name: str,
+        texts: list[str],
+        detect_in_parallel: Callable[[list[str]], list],
+    ) -> list:
+        positions: dict[str, list[int]] = {}
+        for position, text in enumerate(texts):
+            positions.setdefault(normalize_text(text), []).append(position)
+
+        unique_texts = list(positions)
+        keys: list[Hashable] = [
+            (self._configuration, method_name, text) for text in unique_texts
+        ]
+        results: list[Any] = [None] * len(texts)
+        missing = []
+
+        for text, key, (is_found, value) in zip(
+            unique_texts, keys, self.cache.get_many(keys)
+        ):
+            if is_found:
+                for position in positions[text]:
+                    results[position] = value
+            else:
+                missing.append((text, key))
+
+        if len(missing) > 0:
+            values = detect_in_parallel([text for text, _ in missing])
+            self.cache.put_many(
+                [(key, value) for (_, key), value in zip(missing, values)]
+            )
+            for (text, _), value in zip(missing, values):
+                for position in positions[text]:
+                    results[position] = value
+
+        return results
+
+
+def create_zipf_replay(
+    texts: list[str], request_count: int, exponent: float, seed: int
+) -> list[str]:
+    # The texts are ranked randomly, the probability of the text of rank k
+    # being requested is proportional to 1 / k^exponent
+    rng = np.random.default_rng(seed)
+    ranked_texts = rng.permutation(np.array(texts, dtype=object))
+    weights = 1 / np.arange(1, len(ranked_texts) + 1) ** exponent
+    indices = rng.choice(
+        len(ranked_texts), size=request_count, p=weights / weights.sum()
+    )
+    return ranked_texts[indices].tolist()
+
+
+def measure(
+    name: str, detect_in_parallel: Callable[[list[str]], list], batches: list[list[str]]
+) -> dict[str, Any]:
+    text_count = sum(len(batch) for batch in batches)
+    start = time.perf_counter()
+    for batch in batches:
+        detect_in_parallel(batch)
+    seconds = time.perf_counter() - start
+    return {
+        "detector": name,
+        "texts": text_count,
+        "seconds": seconds,
+        "texts_per_second": text_count / seconds,
+    }
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Measure the throughput gain of the result cache "
+        "on a Zipf-distributed replay of the single words test data"
+    )
+    parser.add_argument("--requests", type=int, default=100_000)
+    parser.add_argument("--exponent", type=float, default=1.1)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--cache-size", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    corpus = TestDataCorpus.load()
+    texts = [
+        text
+        for language in sorted(Language.all(), key=lambda language: language.name)
+        for text in corpus.get_texts(language, Category.SINGLE_WORDS)
+    ]
+    replay = create_zipf_replay(texts, args.requests, args.exponent, args.seed)
+    batches = [
+        replay[idx : idx + args.batch_size]
+        for idx in range(0, len(replay), args.batch_size)
+    ]
+    print(
+        f"{len(replay)} requests for {len(set(replay))} distinct "
+        f"out of {len(texts)} texts"
+    )
+
+    detector = (
+        LanguageDetectorBuilder.from_all_languages()
+        .with_preloaded_language_models()
+        .build()
+    )
+    cached_detector = CachedLanguageDetector(
+        detector, "from_all_languages()", ResultCache(max_size=args.cache_size)
+    )
+    rows = [
+        measure("uncached", detector.detect_languages_in_parallel_of, batches),
+        measure("cached", cached_detector.detect_languages_in_parallel_of, batches),
+    ]
+    statistics = cached_detector.cache.get_statistics()
+    rows[1].update(hit_rate=statistics["hit_rate"])
+
+    results = pd.DataFrame(rows).set_index("detector")
+    print(results)
+
+    report_file_path = Path(__file__).parent / "../benchmark-reports/cache-values.csv"
+    report_file_path.parent.mkdir(parents=True, exist_ok=True)
+    results.to_csv(report_file_path, na_rep="NaN")
+
+    print(f"Cache benchmark values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
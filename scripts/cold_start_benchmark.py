@@ -0,0 +1,228 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import multiprocessing
+import pandas as pd
+import psutil
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+# Lingua is imported inside the measuring functions only
+# because the import time is part of the cold start
+
+_builder_modes = ("lazy", "preloaded", "low-accuracy")
+
+_language_sets = {
+    "all": ("from_all_languages", "english"),
+    "arabic-script": ("from_all_languages_with_arabic_script", "arabic"),
+    "cyrillic-script": ("from_all_languages_with_cyrillic_script", "russian"),
+    "devanagari-script": ("from_all_languages_with_devanagari_script", "hindi"),
+    "latin-script": ("from_all_languages_with_latin_script", "english"),
+}
+
+
+def read_sentences(language_name: str) -> list[str]:
+    from lingua import Language
+
+    language = Language.from_str(language_name)
+    test_data_file_path = (
+        Path(__file__).parent
+        / "../language-testdata/sentences"
+        / f"{language.iso_code_639_1.name.lower()}.txt"
+    )
+    with test_data_file_path.open(mode="r") as test_data_file:
+        return [line.rstrip() for line in test_data_file if len(line.rstrip()) > 0]
+
+
+def build_detector(builder_mode: str, language_set: str):
+    from lingua import LanguageDetectorBuilder
+
+    builder_method_name, _ = _language_sets[language_set]
+    builder = getattr(LanguageDetectorBuilder, builder_method_name)()
+    if builder_mode == "preloaded":
+        builder = builder.with_preloaded_language_models()
+    elif builder_mode == "low-accuracy":
+        builder = builder.with_low_accuracy_mode()
+    return builder.build()
+
+
+def measure_cold_start(builder_mode: str, language_set: str) -> dict[str, float]:
+    start = time.perf_counter()
+    import lingua
+
+    stop = time.perf_counter()
+    import_seconds = stop - start
+
+    _, sample_language_name = _language_sets[language_set]
+    first_text, second_text = read_sentences(sample_language_name)[:2]
+
+    start = time.perf_counter()
+    detector = build_detector(builder_mode, language_set)
+    stop = time.perf_counter()
+    build_seconds = stop - start
+
+    start = time.perf_counter()
+    detector.detect_language_of(first_text)
+    stop = time.perf_counter()
+    first_call_seconds = stop - start
+
+    start = time.perf_counter()
+    detector.detect_language_of(second_text)
+    stop = time.perf_counter()
+    second_call_seconds = stop - start
+
+    return {
+        "import_seconds": import_seconds,
+        "build_seconds": build_seconds,
+        "first_call_seconds": first_call_seconds,
+        "second_call_seconds": second_call_seconds,
+        "time_to_first_detection_seconds": import_seconds
+        + build_seconds
+        + first_call_seconds,
+        "rss_mb": psutil.Process().memory_info().rss / 1024**2,
+    }
+
+
+def measure_lazy_loading(language_set: str, language_name: str) -> dict[str, object]:
+    # Every language is measured in a fresh process, otherwise the models
+    # shared with other languages would be charged to the language loading them first
+    from lingua import LanguageDetectorBuilder
+
+    builder_method_name, _ = _language_sets[language_set]
+    detector = getattr(LanguageDetectorBuilder, builder_method_name)().build()
+    process = psutil.Process()
+    first_text, second_text = read_sentences(language_name)[:2]
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    detector.detect_language_of(first_text)
+    stop = time.perf_counter()
+    first_call_seconds = stop - start
+
+    start = time.perf_counter()
+    detector.detect_language_of(second_text)
+    stop = time.perf_counter()
+    second_call_seconds = stop - start
+
+    return {
+        "language": language_name.title(),
+        "first_call_seconds": first_call_seconds,
+        "second_call_seconds": second_call_seconds,
+        "incremental_loading_seconds": max(
+            first_call_seconds - second_call_seconds, 0.0
+        ),
+        "incremental_rss_mb": (process.memory_info().rss - rss_before) / 1024**2,
+    }
+
+
+def detector_languages(language_set: str) -> list:
+    from lingua import Language
+
+    if language_set == "all":
+        return sorted(Language.all())
+    script = language_set.split("-")[0]
+    return sorted(getattr(Language, f"all_with_{script}_script")())
+
+
+def run_in_fresh_process(function, *args):
+    # A fresh interpreter is required for every measurement because
+    # language models which have been loaded once are shared by all
+    # detector instances of the same process
+    with ProcessPoolExecutor(
+        max_workers=1, mp_context=multiprocessing.get_context("spawn")
+    ) as executor:
+        return executor.submit(function, *args).result()
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--modes", nargs="+", choices=_builder_modes, default=list(_builder_modes)
+    )
+    parser.add_argument(
+        "--language-sets",
+        nargs="+",
+        choices=_language_sets.keys(),
+        default=list(_language_sets.keys()),
+    )
+    parser.add_argument(
+        "--repetitions",
+        type=int,
+        default=5,
+        help="number of fresh processes per setup, the median is reported "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--skip-lazy-loading",
+        action="store_true",
+        help="do not measure the lazy loading costs of each single language",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    report_directory_path = Path(__file__).parent / "../benchmark-reports"
+    report_directory_path.mkdir(parents=True, exist_ok=True)
+    rows = []
+
+    for language_set in args.language_sets:
+        for builder_mode in args.modes:
+            print(f"Measuring cold start of {language_set} in {builder_mode} mode...")
+            measurements = pd.DataFrame(
+                [
+                    run_in_fresh_process(measure_cold_start, builder_mode, language_set)
+                    for _ in range(args.repetitions)
+                ]
+            )
+            row = measurements.median().round(4).to_dict()
+            row.update({"language_set": language_set, "mode": builder_mode})
+            rows.append(row)
+
+    cold_start_file_path = report_directory_path / "cold-start-values.csv"
+    pd.DataFrame(rows).set_index(["language_set", "mode"]).to_csv(
+        cold_start_file_path, na_rep="NaN"
+    )
+    print(f"Cold start values written to {cold_start_file_path.resolve()}\n")
+
+    if args.skip_lazy_loading:
+        return
+
+    dataframes = []
+    for language_set in args.language_sets:
+        print(f"Measuring lazy loading costs of {language_set}...")
+        df = pd.DataFrame(
+            [
+                run_in_fresh_process(
+                    measure_lazy_loading, language_set, language.name.lower()
+                )
+                for language in detector_languages(language_set)
+            ]
+        )
+        df.insert(0, "language_set", language_set)
+        dataframes.append(df)
+
+    lazy_loading_file_path = report_directory_path / "lazy-loading-values.csv"
+    pd.concat(dataframes).set_index(["language_set", "language"]).round(4).to_csv(
+        lazy_loading_file_path, na_rep="NaN"
+    )
+    print(f"Lazy loading values written to {lazy_loading_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
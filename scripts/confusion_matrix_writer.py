@@ -0,0 +1,110 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import numpy as np
+import pandas as pd
+import time
+
+from pathlib import Path
+from prediction_results import PredictionResults, supported_languages
+from test_data_corpus import Category, test_data_categories
+
+
+class ConfusionMatrixWriter:
+    _row_labels = [language.name.title() for language in supported_languages]
+    _column_labels = ["Unknown"] + _row_labels
+
+    def __init__(self, results: PredictionResults):
+        self._detector_names = results.detector_names
+        self._counts = results.compute_confusion_matrices()
+
+    def write_confusion_matrices(self, directory_path: Path):
+        # The average matrix sums up the counts of all categories
+        counts_per_category = {
+            Category.AVERAGE: self._counts.sum(axis=1),
+            **{
+                category: self._counts[:, position]
+                for position, category in enumerate(test_data_categories)
+            },
+        }
+        rates_per_category = {
+            category: self._compute_rates(counts)
+            for category, counts in counts_per_category.items()
+        }
+
+        for idx, detector_name in enumerate(self._detector_names):
+            detector_directory_path = directory_path / detector_name
+            detector_directory_path.mkdir(parents=True, exist_ok=True)
+
+            np.savez_compressed(
+                detector_directory_path / "confusion-matrices.npz",
+                languages=np.array(self._row_labels, dtype=str),
+                **{
+                    f"{category.folder_name()}-counts": counts[idx]
+                    for category, counts in counts_per_category.items()
+                },
+                **{
+                    f"{category.folder_name()}-rates": rates[idx]
+                    for category, rates in rates_per_category.items()
+                },
+            )
+
+            for category in Category:
+                prefix = category.folder_name()
+                self._to_dataframe(counts_per_category[category][idx]).to_csv(
+                    detector_directory_path / f"{prefix}-counts.csv",
+                    index_label="language",
+                )
+                self._to_dataframe(rates_per_category[category][idx] * 100).to_csv(
+                    detector_directory_path / f"{prefix}-rates.csv",
+                    index_label="language",
+                    na_rep="NaN",
+                )
+
+    def _compute_rates(self, counts: np.ndarray) -> np.ndarray:
+        row_sums = counts.sum(axis=-1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(row_sums > 0, counts / row_sums, np.nan)
+
+    def _to_dataframe(self, matrix: np.ndarray) -> pd.DataFrame:
+        return pd.DataFrame(matrix, index=self._row_labels, columns=self._column_labels)
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--detectors",
+        nargs="+",
+        help="detectors whose stored predictions are used (default: all)",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_command_line_args()
+    start = time.perf_counter()
+    results = (
+        PredictionResults.load_detectors(args.detectors)
+        if args.detectors is not None
+        else PredictionResults.load_all()
+    )
+    writer = ConfusionMatrixWriter(results)
+    writer.write_confusion_matrices(
+        directory_path=Path(__file__).parent / "../accuracy-reports/confusion-matrices"
+    )
+    stop = time.perf_counter()
+
+    print(f"All confusion matrices created successfully in {stop - start:.2f} seconds")
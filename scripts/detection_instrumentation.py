@@ -0,0 +1,278 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cProfile
+import heapq
+import json
+import numpy as np
+import pstats
+import sys
+import threading
+import time
+
+from collections import Counter
+from lingua import Language
+from pathlib import Path
+from test_data_corpus import Category
+from typing import Any, Callable, Optional
+
+# Text lengths in characters, every bucket includes its upper bound
+_length_bucket_bounds = (8, 16, 32, 64, 128, 256, 512, 1024)
+
+# Latencies in microseconds between 1 µs and 10 s, eight bins per decade
+_latency_bin_edges = np.logspace(0, 7, 57)
+
+
+def get_length_bucket(text_length: int) -> str:
+    lower_bound = 1
+    for upper_bound in _length_bucket_bounds:
+        if text_length <= upper_bound:
+            return f"{lower_bound}-{upper_bound}"
+        lower_bound = upper_bound + 1
+    return f"{lower_bound}+"
+
+
+def detect_timed(
+    detect: Callable[[list[str]], list[Optional[Language]]], texts: list[str]
+) -> tuple[list[Optional[Language]], np.ndarray]:
+    # Every text is classified in a call of its own,
+    # so that its latency can be attributed to it
+    detected_languages = []
+    latencies = np.empty(len(texts))
+    for idx, text in enumerate(texts):
+        start = time.perf_counter()
+        detected_languages.extend(detect([text]))
+        latencies[idx] = time.perf_counter() - start
+    return detected_languages, latencies
+
+
+class LatencyRecorder:
+    # Keeps a histogram of the per-text latencies and the slowest inputs
+    # for every combination of detector, language, category and length bucket
+    def __init__(self, slowest_input_count: int = 5):
+        self._slowest_input_count = slowest_input_count
+        self._histograms: dict[tuple[str, str, str, str], np.ndarray] = {}
+        self._total_seconds: dict[tuple[str, str, str, str], float] = {}
+        self._slowest_inputs: dict[
+            tuple[str, str, str, str], list[tuple[float, str]]
+        ] = {}
+
+    def record(
+        self,
+        detector_name: str,
+        language: Language,
+        category: Category,
+        texts: list[str],
+        latencies: np.ndarray,
+    ):
+        buckets = np.array([get_length_bucket(len(text)) for text in texts])
+        bin_indices = np.clip(
+            np.searchsorted(_latency_bin_edges, latencies * 1e6, side="right") - 1,
+            0,
+            len(_latency_bin_edges) - 2,
+        )
+
+        for bucket in np.unique(buckets):
+            key = (detector_name, language.name, category.folder_name(), str(bucket))
+            positions = np.flatnonzero(buckets == bucket)
+            histogram = self._histograms.setdefault(
+                key, np.zeros(len(_latency_bin_edges) - 1, dtype=np.int64)
+            )
+            np.add.at(histogram, bin_indices[positions], 1)
+            self._total_seconds[key] = self._total_seconds.get(key, 0.0) + float(
+                latencies[positions].sum()
+            )
+
+            slowest_inputs = self._slowest_inputs.setdefault(key, [])
+            for position in positions:
+                item = (float(latencies[position]), texts[position])
+                if len(slowest_inputs) < self._slowest_input_count:
+                    heapq.heappush(slowest_inputs, item)
+                else:
+                    heapq.heappushpop(slowest_inputs, item)
+
+    def to_dict(self) -> dict[str, Any]:
+        buckets: list[dict[str, Any]] = []
+        for key, histogram in self._histograms.items():
+            detector_name, language_name, category_name, length_bucket = key
+            buckets.append(
+                {
+                    "detector": detector_name,
+                    "language": language_name,
+                    "category": category_name,
+                    "length_bucket": length_bucket,
+                    "count": int(histogram.sum()),
+                    "total_seconds": self._total_seconds[key],
+                    "p50_us": self._estimate_percentile(histogram, 50),
+                    "p99_us": self._estimate_percentile(histogram, 99),
+                    # Only the bins containing latencies are listed
+                    "histogram": {
+                        f"{_latency_bin_edges[idx]:.1f}": int(histogram[idx])
+                        for idx in np.flatnonzero(histogram)
+                    },
+                    "slowest_inputs": [
+                        {"latency_us": seconds * 1e6, "text": text}
+                        for seconds, text in sorted(
+                            self._slowest_inputs[key], reverse=True
+                        )
+                    ],
+                }
+            )
+        buckets.sort(key=lambda bucket: bucket["total_seconds"], reverse=True)
+        return {
+            "latency_bin_edges_us": _latency_bin_edges.round(1).tolist(),
+            "buckets": buckets,
+        }
+
+    def get_slowest_inputs(self, count: int) -> list[tuple[float, str, str]]:
+        slowest_inputs = [
+            (seconds, key[0], text)
+            for key, items in self._slowest_inputs.items()
+            for seconds, text in items
+        ]
+        return heapq.nlargest(count, slowest_inputs)
+
+    def save(self, file_path: Path):
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open(mode="w", encoding="utf-8") as json_file:
+            json.dump(self.to_dict(), json_file, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _estimate_percentile(histogram: np.ndarray, percentile: float) -> float:
+        # The upper edge of the bin containing the percentile is reported
+        cumulative_counts = np.cumsum(histogram)
+        idx = np.searchsorted(
+            cumulative_counts, cumulative_counts[-1] * percentile / 100
+        )
+        return float(_latency_bin_edges[idx + 1])
+
+
+class SamplingProfiler:
+    # Records the Python call stacks of all other threads at a fixed interval.
+    # Time spent in native code is attributed to the Python frame calling it.
+    def __init__(self, interval: float = 0.005):
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self.stack_counts: Counter = Counter()
+
+    def __enter__(self) -> "SamplingProfiler":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop_event.set()
+        self._thread.join()
+
+    def save(self, output_directory: Path):
+        output_directory.mkdir(parents=True, exist_ok=True)
+        with (output_directory / "sampling-profile.collapsed").open(
+            mode="w", encoding="utf-8"
+        ) as collapsed_file:
+            for stack, count in self.stack_counts.most_common():
+                collapsed_file.write(f"{stack} {count}\n")
+
+        own_counts: Counter = Counter()
+        for stack, count in self.stack_counts.items():
+            own_counts[stack.rsplit(";", 1)[-1]] += count
+        total_count = max(sum(own_counts.values()), 1)
+        with (output_directory / "sampling-profile.json").open(
+            mode="w", encoding="utf-8"
+        ) as json_file:
+            json.dump(
+                {
+                    "interval_seconds": self._interval,
+                    "samples": sum(self.stack_counts.values()),
+                    "functions": [
+                        {
+                            "function": function,
+                            "samples": count,
+                            "share": count / total_count,
+                        }
+                        for function, count in own_counts.most_common()
+                    ],
+                },
+                json_file,
+                indent=2,
+            )
+
+    def _sample(self):
+        own_thread_id = threading.get_ident()
+        while not self._stop_event.wait(self._interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread_id:
+                    continue
+                stack = []
+                current_frame: Any = frame
+                while current_frame is not None:
+                    code = current_frame.f_code
+                    stack.append(
+                        f"{code.co_name} ({Path(code.co_filename).name}:"
+                        f"{code.co_firstlineno})"
+                    )
+                    current_frame = current_frame.f_back
+                self.stack_counts[";".join(reversed(stack))] += 1
+
+
+class DeterministicProfiler:
+    # Wraps cProfile. The binary profile can be opened by flame graph viewers
+    # such as snakeviz or flameprof, the JSON file lists every function.
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def __enter__(self) -> "DeterministicProfiler":
+        self._profile.enable()
+        return self
+
+    def __exit__(self, *args):
+        self._profile.disable()
+
+    def save(self, output_directory: Path):
+        output_directory.mkdir(parents=True, exist_ok=True)
+        self._profile.dump_stats(output_directory / "cprofile.prof")
+
+        stats = pstats.Stats(self._profile)
+        functions = []
+        for (file_name, line_number, function_name), (
+            primitive_call_count,
+            call_count,
+            total_time,
+            cumulative_time,
+            _,
+        ) in stats.stats.items():  # type: ignore
+            functions.append(
+                {
+                    "function": f"{function_name} ({Path(file_name).name}:{line_number})",
+                    "calls": call_count,
+                    "primitive_calls": primitive_call_count,
+                    "total_seconds": total_time,
+                    "cumulative_seconds": cumulative_time,
+                }
+            )
+        functions.sort(key=lambda function: function["total_seconds"], reverse=True)
+        with (output_directory / "cprofile.json").open(
+            mode="w", encoding="utf-8"
+        ) as json_file:
+            json.dump({"functions": functions}, json_file, indent=2)
+
+
+def create_profiler(
+    profiler_name: Optional[str],
+) -> Optional[SamplingProfiler | DeterministicProfiler]:
+    if profiler_name == "cprofile":
+        return DeterministicProfiler()
+    if profiler_name == "sampling":
+        return SamplingProfiler()
+    return None
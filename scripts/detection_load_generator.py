@@ -0,0 +1,222 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import http.client
+import json
+import numpy as np
+import pandas as pd
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from lingua import Language
+from pathlib import Path
+from test_data_corpus import Category, TestDataCorpus
+from typing import Optional
+from urllib.parse import urlsplit
+
+_endpoints = ("detect-language", "confidence-values", "multiple-languages")
+
+
+class LoadGenerator:
+    def __init__(self, url: str, endpoint: str, texts: list[str], batch_size: int):
+        address = urlsplit(url)
+        self._host = address.hostname or "127.0.0.1"
+        self._port = address.port or 80
+        self._path = f"/{endpoint}"
+        self._texts = texts
+        self._batch_size = batch_size
+        self._connections = threading.local()
+
+    def run(self, rate: float, duration: float, concurrency: int) -> "LoadTestResult":
+        request_count = int(rate * duration)
+        latencies = np.full(request_count, np.nan)
+        start = time.perf_counter() + 0.1
+
+        # Requests are sent on a fixed schedule. The latency is measured from
+        # the scheduled time, so a server that falls behind is not hidden by
+        # clients waiting for earlier responses (coordinated omission).
+        def send(request_index: int):
+            scheduled_time = start + request_index / rate
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            if self._send_request(request_index):
+                latencies[request_index] = time.perf_counter() - scheduled_time
+
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(send, range(request_count)))
+
+        stop = time.perf_counter()
+        return LoadTestResult(
+            endpoint=self._path.lstrip("/"),
+            rate=rate,
+            batch_size=self._batch_size,
+            latencies=latencies,
+            seconds=stop - start,
+        )
+
+    def _send_request(self, request_index: int) -> bool:
+        first = request_index * self._batch_size
+        texts = [
+            self._texts[(first + offset) % len(self._texts)]
+            for offset in range(self._batch_size)
+        ]
+        payload = {"text": texts[0]} if self._batch_size == 1 else {"texts": texts}
+        body = json.dumps(payload).encode("utf-8")
+
+        # Each thread keeps its connection open for subsequent requests
+        connection: Optional[http.client.HTTPConnection] = getattr(
+            self._connections, "connection", None
+        )
+        try:
+            if connection is None:
+                connection = http.client.HTTPConnection(self._host, self._port)
+                self._connections.connection = connection
+            connection.request(
+                "POST", self._path, body, {"Content-Type": "application/json"}
+            )
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200
+        except (OSError, http.client.HTTPException):
+            if connection is not None:
+                connection.close()
+            self._connections.connection = None
+            return False
+
+
+class LoadTestResult:
+    def __init__(
+        self,
+        endpoint: str,
+        rate: float,
+        batch_size: int,
+        latencies: np.ndarray,
+        seconds: float,
+    ):
+        self.endpoint = endpoint
+        self.rate = rate
+        self.batch_size = batch_size
+        self.latencies = latencies
+        self.seconds = seconds
+
+    def to_dataframe(self) -> pd.DataFrame:
+        successful = self.latencies[~np.isnan(self.latencies)]
+        p50, p95, p99 = (
+            np.percentile(successful, [50, 95, 99]) * 1000
+            if len(successful) > 0
+            else (np.nan, np.nan, np.nan)
+        )
+        return pd.DataFrame(
+            [
+                {
+                    "endpoint": self.endpoint,
+                    "target_rate": self.rate,
+                    "batch_size": self.batch_size,
+                    "requests": len(self.latencies),
+                    "errors": len(self.latencies) - len(successful),
+                    "requests_per_second": len(successful) / self.seconds,
+                    "texts_per_second": len(successful)
+                    * self.batch_size
+                    / self.seconds,
+                    "p50_ms": p50,
+                    "p95_ms": p95,
+                    "p99_ms": p99,
+                }
+            ]
+        ).set_index(["endpoint", "target_rate", "batch_size"])
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay the test data against a running detection server "
+        "at a fixed request rate"
+    )
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoint", choices=_endpoints, default=_endpoints[0])
+    parser.add_argument(
+        "--category",
+        choices=[category.folder_name() for category in Category][1:],
+        default=Category.SENTENCES.folder_name(),
+    )
+    parser.add_argument(
+        "--rates",
+        nargs="+",
+        type=float,
+        default=[100.0],
+        help="requests per second, every rate is measured separately",
+    )
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=64)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    category = next(
+        category for category in Category if category.folder_name() == args.category
+    )
+    corpus = TestDataCorpus.load()
+    languages = sorted(Language.all(), key=lambda language: language.name)
+    texts_per_language = [
+        corpus.get_texts(language, category) for language in languages
+    ]
+
+    # The languages are interleaved so that every batch is mixed
+    texts = [
+        texts[idx]
+        for idx in range(max(len(texts) for texts in texts_per_language))
+        for texts in texts_per_language
+        if idx < len(texts)
+    ]
+
+    report_file_path = (
+        Path(__file__).parent / "../benchmark-reports/load-test-values.csv"
+    )
+    dataframes = []
+    generator = LoadGenerator(args.url, args.endpoint, texts, args.batch_size)
+
+    for rate in args.rates:
+        result = generator.run(rate, args.duration, args.concurrency)
+        dataframe = result.to_dataframe()
+        row = dataframe.iloc[0]
+        print(
+            f"{rate:.0f} requests/s: {row['requests_per_second']:.1f} requests/s "
+            f"served, p50 {row['p50_ms']:.1f} ms, p95 {row['p95_ms']:.1f} ms, "
+            f"p99 {row['p99_ms']:.1f} ms, {row['errors']:.0f} errors"
+        )
+        dataframes.append(dataframe)
+
+    results = pd.concat(dataframes)
+    report_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        dataframe = pd.read_csv(
+            report_file_path, index_col=["endpoint", "target_rate", "batch_size"]
+        )
+        results = pd.concat([dataframe.drop(results.index, errors="ignore"), results])
+    except FileNotFoundError:
+        pass
+
+    results.sort_index().to_csv(report_file_path, na_rep="NaN")
+
+    print(f"Load test values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
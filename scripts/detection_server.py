@@ -0,0 +1,263 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import asyncio
+import json
+import threading
+import time
+
+from async_language_detector import AsyncLanguageDetector
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from lingua import (
+    ConfidenceValue,
+    DetectionResult,
+    Language,
+    LanguageDetectorBuilder,
+)
+from typing import Any, Callable, Optional
+
+
+def serialize_language(language: Optional[Language]) -> Optional[str]:
+    return language.name if language is not None else None
+
+
+def serialize_confidence_values(
+    confidence_values: list[ConfidenceValue],
+) -> list[dict[str, Any]]:
+    return [
+        {"language": confidence.language.name, "value": confidence.value}
+        for confidence in confidence_values
+    ]
+
+
+def serialize_detection_results(
+    detection_results: list[DetectionResult],
+) -> list[dict[str, Any]]:
+    return [
+        {
+            "start_index": result.start_index,
+            "end_index": result.end_index,
+            "word_count": result.word_count,
+            "language": result.language.name,
+        }
+        for result in detection_results
+    ]
+
+
+class DetectionService:
+    # The HTTP server handles every request in its own thread, whereas
+    # all detections are micro-batched by an event loop in a background thread
+    _endpoints: dict[str, tuple[str, Callable[[Any], Any]]] = {
+        "/detect-language": ("detect_language_of", serialize_language),
+        "/confidence-values": (
+            "compute_language_confidence_values",
+            serialize_confidence_values,
+        ),
+        "/multiple-languages": (
+            "detect_multiple_languages_of",
+            serialize_detection_results,
+        ),
+    }
+
+    def __init__(self, async_detector: AsyncLanguageDetector):
+        self._async_detector = async_detector
+        self._loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(
+            target=self._loop.run_forever, name="detection-loop", daemon=True
+        )
+        self._start_time = time.time()
+        self._http_request_count = 0
+        self._http_error_count = 0
+        self._counter_lock = threading.Lock()
+
+    def start(self):
+        self._loop_thread.start()
+
+    def stop(self):
+        asyncio.run_coroutine_threadsafe(
+            self._async_detector.close(), self._loop
+        ).result()
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._loop_thread.join()
+
+    def has_endpoint(self, path: str) -> bool:
+        return path in self._endpoints
+
+    def handle(self, path: str, payload: dict) -> dict[str, Any]:
+        method_name, serialize = self._endpoints[path]
+        detect = getattr(self._async_detector, method_name)
+
+        if "texts" in payload:
+            texts = payload["texts"]
+            if not isinstance(texts, list) or not all(
+                isinstance(text, str) for text in texts
+            ):
+                raise ValueError("'texts' must be a list of strings")
+            coroutine: Any = self._gather(detect, texts)
+        elif isinstance(payload.get("text"), str):
+            coroutine = detect(payload["text"])
+        else:
+            raise ValueError("either 'text' or 'texts' must be given")
+
+        result = asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+        if "texts" in payload:
+            return {"results": [serialize(item) for item in result]}
+        return {"result": serialize(result)}
+
+    async def _gather(self, detect, texts: list[str]) -> list:
+        # The texts of a batch request are submitted individually,
+        # so that they share batches with concurrent single requests
+        return list(await asyncio.gather(*(detect(text) for text in texts)))
+
+    def count_request(self, is_error: bool):
+        with self._counter_lock:
+            self._http_request_count += 1
+            if is_error:
+                self._http_error_count += 1
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._counter_lock:
+            http_metrics = {
+                "requests": self._http_request_count,
+                "errors": self._http_error_count,
+                "uptime_seconds": round(time.time() - self._start_time, 3),
+            }
+        detector_metrics = asyncio.run_coroutine_threadsafe(
+            self._collect_detector_metrics(), self._loop
+        ).result()
+        return {"http": http_metrics, "detector": detector_metrics}
+
+    async def _collect_detector_metrics(self) -> dict[str, Any]:
+        # The metrics are only modified by the event loop,
+        # so they are read there as well
+        return self._async_detector.get_metrics()
+
+
+class DetectionRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    service: DetectionService
+
+    def do_GET(self):
+        if self.path == "/metrics":
+            self._send_json(200, self.service.get_metrics())
+        elif self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        else:
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            content_length = int(self.headers.get("Content-Length", 0))
+            if content_length < 0:
+                raise ValueError
+        except ValueError:
+            # Without a valid length, the body cannot be skipped,
+            # so the connection is closed after the response
+            self.close_connection = True
+            self._send_json(400, {"error": "invalid Content-Length header"})
+            return
+        body = self.rfile.read(content_length)
+
+        if not self.service.has_endpoint(self.path):
+            self._send_json(404, {"error": f"unknown path {self.path}"})
+            return
+
+        try:
+            payload = json.loads(body)
+            if not isinstance(payload, dict):
+                raise ValueError("the request body must be a JSON object")
+            response = self.service.handle(self.path, payload)
+        except ValueError as error:
+            self._send_json(400, {"error": str(error)})
+            return
+        except Exception as error:
+            self._send_json(500, {"error": f"language detection failed: {error}"})
+            return
+
+        self._send_json(200, response)
+
+    def log_message(self, format: str, *args: Any):
+        pass
+
+    def _send_json(self, status: int, content: dict[str, Any]):
+        if self.path not in ("/metrics", "/health"):
+            self.service.count_request(is_error=status >= 400)
+        body = json.dumps(content).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Serve language detection over HTTP with preloaded models"
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=[language.name.lower() for language in Language.all()],
+    )
+    parser.add_argument("--low-accuracy", action="store_true")
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+
+    if args.languages is not None:
+        languages = [Language.from_str(name) for name in args.languages]
+        builder = LanguageDetectorBuilder.from_languages(*languages)
+    else:
+        builder = LanguageDetectorBuilder.from_all_languages()
+    if args.low_accuracy:
+        builder = builder.with_low_accuracy_mode()
+
+    start = time.perf_counter()
+    detector = builder.with_preloaded_language_models().build()
+    stop = time.perf_counter()
+    print(f"Language models loaded in {stop - start:.2f} seconds")
+
+    service = DetectionService(
+        AsyncLanguageDetector(
+            detector,
+            max_batch_size=args.max_batch_size,
+            max_wait_seconds=args.max_wait_ms / 1000,
+        )
+    )
+    DetectionRequestHandler.service = service
+    server = ThreadingHTTPServer((args.host, args.port), DetectionRequestHandler)
+    server.daemon_threads = True
+    service.start()
+
+    print(f"Serving language detection on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.stop()
+
+
+if __name__ == "__main__":
+    main()
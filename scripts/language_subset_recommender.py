@@ -0,0 +1,385 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import io
+import numpy as np
+import pandas as pd
+import sys
+import time
+
+from bulk_language_detector import open_binary_input
+from collections import Counter
+from contextlib import ExitStack
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+from pathlib import Path
+from prediction_results import (
+    PredictionResults,
+    encode_language,
+    get_results_directory,
+    supported_languages,
+)
+from typing import Optional
+
+
+class LanguageSubsetRecommender:
+    def __init__(
+        self,
+        texts: list[str],
+        target_share: float,
+        confusion_counts: Optional[np.ndarray],
+        min_confusion_share: float = 0.02,
+        max_iterations: int = 10,
+        timing_repetitions: int = 5,
+    ):
+        self._texts = texts
+        self._target_share = target_share
+        self._confusion_counts = confusion_counts
+        self._min_confusion_share = min_confusion_share
+        self._max_iterations = max_iterations
+        self._timing_repetitions = timing_repetitions
+        self._full_detector = (
+            LanguageDetectorBuilder.from_all_languages()
+            .with_preloaded_language_models()
+            .build()
+        )
+        self._subset_detector: Optional[LanguageDetector] = None
+        self.full_predictions: list[Optional[Language]] = []
+
+    def profile(self) -> Counter:
+        self.full_predictions = self._detect(self._full_detector)
+        return Counter(
+            language for language in self.full_predictions if language is not None
+        )
+
+    def recommend(self) -> Optional[tuple[list[Language], list[Optional[Language]]]]:
+        distribution = self.profile()
+
+        # Removing a language from the detector can only change the predictions
+        # of the texts classified as this language, so the most frequent
+        # languages are added until they cover the target share. Texts without
+        # a prediction cannot be covered, they stay unchanged anyway.
+        languages: list[Language] = []
+        covered_count = 0
+        detected_count = distribution.total()
+        for language, count in distribution.most_common():
+            if covered_count >= self._target_share * detected_count:
+                break
+            languages.append(language)
+            covered_count += count
+        for language in self.find_confusable_languages(languages):
+            if language not in languages:
+                languages.append(language)
+
+        # A single language would turn the detector into a single language
+        # detector, so there is nothing to recommend for such samples
+        if len(languages) < 2:
+            return None
+
+        # As the rule-based engine and the normalization of the confidence values
+        # depend on the language set, the recommendation is verified by
+        # classifying the sample again. Languages are added as long as too many
+        # predictions change.
+        for _ in range(self._max_iterations):
+            subset_detector = (
+                LanguageDetectorBuilder.from_languages(*languages)
+                .with_preloaded_language_models()
+                .build()
+            )
+            subset_predictions = self._detect(subset_detector)
+            changed_languages: Counter = Counter(
+                full_prediction
+                for full_prediction, subset_prediction in zip(
+                    self.full_predictions, subset_predictions
+                )
+                if full_prediction != subset_prediction
+                and full_prediction is not None
+                and full_prediction not in languages
+            )
+            if self.compute_unchanged_share(subset_predictions) >= self._target_share:
+                break
+            if len(changed_languages) == 0:
+                break
+            languages.append(changed_languages.most_common(1)[0][0])
+
+        self._subset_detector = subset_detector
+        return sorted(languages, key=lambda language: language.name), subset_predictions
+
+    def find_confusable_languages(self, languages: list[Language]) -> list[Language]:
+        # Texts of a selected language which the full detector assigns to a
+        # confusable language would change their prediction without it,
+        # so every language is added which texts of a selected language are
+        # mistaken for at least min_confusion_share of the time
+        if self._confusion_counts is None:
+            return []
+        confusable_languages = []
+        for language in languages:
+            row = self._confusion_counts[encode_language(language)]
+            if row.sum() == 0:
+                continue
+            for code in np.flatnonzero(
+                row[1:] >= self._min_confusion_share * row.sum()
+            ):
+                confusable_language = supported_languages[code]
+                if confusable_language != language:
+                    confusable_languages.append(confusable_language)
+        return confusable_languages
+
+    def measure_seconds(self) -> tuple[float, float]:
+        # The median of several runs after a warm-up run is reported
+        # for the full and the recommended detector
+        if self._subset_detector is None:
+            raise ValueError("no recommendation has been made yet")
+        medians = []
+        for detector in (self._full_detector, self._subset_detector):
+            self._detect(detector)
+            durations = []
+            for _ in range(self._timing_repetitions):
+                start = time.perf_counter()
+                self._detect(detector)
+                durations.append(time.perf_counter() - start)
+            medians.append(float(np.median(durations)))
+        return medians[0], medians[1]
+
+    def compute_unchanged_share(
+        self, subset_predictions: list[Optional[Language]]
+    ) -> float:
+        unchanged_count = sum(
+            1
+            for full_prediction, subset_prediction in zip(
+                self.full_predictions, subset_predictions
+            )
+            if full_prediction == subset_prediction
+        )
+        return unchanged_count / max(len(self._texts), 1)
+
+    def find_absorbing_language(
+        self, excluded_language: Language, languages: list[Language]
+    ) -> Optional[Language]:
+        # The confusion matrix of the accuracy reports tells which of the
+        # remaining languages texts of an excluded language are most often
+        # mistaken for, so they will most likely be classified as this language
+        if self._confusion_counts is None:
+            return None
+        row = self._confusion_counts[encode_language(excluded_language)]
+        candidates = [encode_language(language) for language in languages]
+        best_code = max(candidates, key=lambda code: row[code + 1])
+        if row[best_code + 1] == 0:
+            return None
+        return supported_languages[best_code]
+
+    def create_report(
+        self, languages: list[Language], subset_predictions: list[Optional[Language]]
+    ) -> pd.DataFrame:
+        full_counts = Counter(self.full_predictions)
+        subset_counts = Counter(subset_predictions)
+        rows = []
+        for language, count in full_counts.most_common():
+            if language is None:
+                continue
+            is_included = language in languages
+            absorbing_language = (
+                None
+                if is_included
+                else self.find_absorbing_language(language, languages)
+            )
+            rows.append(
+                {
+                    "language": language.name.title(),
+                    "sample_share": 100 * count / len(self._texts),
+                    "included": is_included,
+                    "subset_share": 100 * subset_counts[language] / len(self._texts),
+                    "likely_classified_as": (
+                        absorbing_language.name.title()
+                        if absorbing_language is not None
+                        else ""
+                    ),
+                }
+            )
+        return pd.DataFrame(
+            rows,
+            columns=[
+                "language",
+                "sample_share",
+                "included",
+                "subset_share",
+                "likely_classified_as",
+            ],
+        ).set_index("language")
+
+    def _detect(self, detector: LanguageDetector) -> list[Optional[Language]]:
+        return detector.detect_languages_in_parallel_of(self._texts)
+
+
+def read_texts(file_names: list[str], max_text_count: Optional[int]) -> list[str]:
+    texts = []
+    for file_name in file_names:
+        with ExitStack() as exit_stack:
+            binary_stream = open_binary_input(file_name, exit_stack)
+            lines = io.TextIOWrapper(binary_stream, encoding="utf-8")
+            exit_stack.callback(lines.detach)
+            for line in lines:
+                text = line.strip()
+                if len(text) > 0:
+                    texts.append(text)
+                if max_text_count is not None and len(texts) >= max_text_count:
+                    return texts
+    return texts
+
+
+def load_confusion_counts(detector_name: str) -> Optional[np.ndarray]:
+    # The confusion counts of all test data categories are summed up
+    try:
+        results = PredictionResults.load(
+            get_results_directory() / f"{detector_name}.npz"
+        )
+    except FileNotFoundError:
+        return None
+    return results.compute_confusion_matrices()[0].sum(axis=0)
+
+
+def format_builder_call(languages: list[Language]) -> str:
+    excluded_languages = sorted(
+        Language.all() - set(languages), key=lambda language: language.name
+    )
+    if len(excluded_languages) < len(languages):
+        arguments = ", ".join(
+            f"Language.{language.name}" for language in excluded_languages
+        )
+        return f"LanguageDetectorBuilder.from_all_languages_without({arguments})"
+    arguments = ", ".join(f"Language.{language.name}" for language in languages)
+    return f"LanguageDetectorBuilder.from_languages({arguments})"
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Recommend the smallest language set that keeps a target share "
+        "of the predictions for a sample of texts unchanged"
+    )
+    parser.add_argument(
+        "files",
+        nargs="*",
+        default=["-"],
+        help="text files with one text per line, optionally gzip- or "
+        "zstd-compressed, '-' reads from stdin (default: stdin)",
+    )
+    parser.add_argument(
+        "--target-share",
+        type=float,
+        default=0.99,
+        help="share of predictions that must stay unchanged (default: %(default)s)",
+    )
+    parser.add_argument("--max-texts", type=int, default=100_000)
+    parser.add_argument(
+        "--confusion-detector",
+        default="lingua-high-accuracy",
+        help="detector whose stored predictions provide the confusion matrix "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--min-confusion-share",
+        type=float,
+        default=0.02,
+        help="share of the texts of a selected language that must be mistaken for "
+        "another language to add it as well (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--timing-repetitions",
+        type=int,
+        default=5,
+        help="number of timed runs per detector, the median is reported "
+        "(default: %(default)s)",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    texts = read_texts(args.files, args.max_texts)
+    if len(texts) == 0:
+        sys.exit("The sample does not contain any texts")
+    confusion_counts = load_confusion_counts(args.confusion_detector)
+    if confusion_counts is None:
+        print(
+            f"No stored predictions found for {args.confusion_detector}, "
+            "run the accuracy reporter first to include confusion data"
+        )
+
+    recommender = LanguageSubsetRecommender(
+        texts,
+        args.target_share,
+        confusion_counts,
+        min_confusion_share=args.min_confusion_share,
+        timing_repetitions=args.timing_repetitions,
+    )
+    recommendation = recommender.recommend()
+    if recommendation is None:
+        sys.exit(
+            "No recommendation is possible, the sample was classified as "
+            "less than two languages"
+        )
+    languages, subset_predictions = recommendation
+    full_seconds, subset_seconds = recommender.measure_seconds()
+    report = recommender.create_report(languages, subset_predictions)
+
+    changed_predictions = pd.DataFrame(
+        [
+            {
+                "text": text,
+                "all_languages": (
+                    full_prediction.name if full_prediction is not None else None
+                ),
+                "recommended_languages": (
+                    subset_prediction.name if subset_prediction is not None else None
+                ),
+            }
+            for text, full_prediction, subset_prediction in zip(
+                texts, recommender.full_predictions, subset_predictions
+            )
+            if full_prediction != subset_prediction
+        ],
+        columns=["text", "all_languages", "recommended_languages"],
+    )
+
+    print(report.to_string(float_format="{:.2f}".format))
+    print()
+    print(f"Recommended {len(languages)} languages:")
+    print(format_builder_call(languages))
+    unchanged_share = recommender.compute_unchanged_share(subset_predictions)
+    print(f"Unchanged predictions: {100 * unchanged_share:.2f}%")
+    if unchanged_share < args.target_share:
+        print(
+            f"The target share of {100 * args.target_share:.2f}% has not been "
+            "reached, no further language reduces the changed predictions"
+        )
+    print(
+        f"All languages: {full_seconds:.2f} seconds, recommended languages: "
+        f"{subset_seconds:.2f} seconds, speedup: {full_seconds / subset_seconds:.2f}x"
+    )
+
+    report_directory_path = (
+        Path(__file__).parent / "../benchmark-reports/language-subset-recommendation"
+    )
+    report_directory_path.mkdir(parents=True, exist_ok=True)
+    report.to_csv(report_directory_path / "languages.csv", na_rep="NaN")
+    changed_predictions.to_csv(
+        report_directory_path / "changed-predictions.csv", index=False
+    )
+
+    print(f"Recommendation written to {report_directory_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import matplotlib
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import seaborn as sns
+import time
+
+from lingua import Language, LanguageDetector, LanguageDetectorBuilder
+from pathlib import Path
+from test_data_corpus import Category, TestDataCorpus
+
+matplotlib.use("Agg")
+sns.set()
+sns.set_style("whitegrid")
+
+_builder_modes = ("high-accuracy", "low-accuracy")
+_methods = (
+    "detect_language_of",
+    "compute_language_confidence_values",
+    "detect_multiple_languages_of",
+)
+_percentiles = (50, 90, 99)
+
+
+def build_detector(builder_mode: str) -> LanguageDetector:
+    builder = LanguageDetectorBuilder.from_all_languages()
+    if builder_mode == "low-accuracy":
+        builder = builder.with_low_accuracy_mode()
+    return builder.with_preloaded_language_models().build()
+
+
+def create_inputs(
+    corpus: TestDataCorpus,
+    languages: list[Language],
+    text_length: int,
+    sample_count: int,
+    rng: np.random.Generator,
+) -> list[str]:
+    # Random sentences of a random language are concatenated until the text
+    # is long enough and then cut off at the requested number of characters
+    inputs = []
+    for language in rng.choice(np.array(languages, dtype=object), size=sample_count):
+        sentences = corpus.get_texts(language, Category.SENTENCES)
+        text = ""
+        while len(text) < text_length:
+            text += sentences[rng.integers(len(sentences))] + " "
+        inputs.append(text[:text_length])
+    return inputs
+
+
+def measure_latencies(
+    detector: LanguageDetector, method: str, texts: list[str]
+) -> np.ndarray:
+    detect = getattr(detector, method)
+    latencies = np.empty(len(texts))
+    for idx, text in enumerate(texts):
+        start = time.perf_counter()
+        detect(text)
+        latencies[idx] = time.perf_counter() - start
+    return latencies
+
+
+class LatencyPlotDrawer:
+    _dpi = 40
+    _ticks_fontsize = 28
+    _label_fontsize = 32
+    _title_fontsize = 38
+    _fontweight = "bold"
+    _grid_color = "#474747"
+    _palette = ("#b259ff", "#ff8800", "#41c46b")
+    _linestyles = {50: "-", 90: "--", 99: ":"}
+
+    def __init__(self, latencies: pd.DataFrame):
+        self._latencies = latencies.reset_index()
+
+    def draw_lineplot(self, file_path: Path):
+        builder_modes = self._latencies["mode"].unique()
+        figure, all_axes = plt.subplots(
+            ncols=len(builder_modes),
+            figsize=(18 * len(builder_modes), 16),
+            sharey=True,
+            squeeze=False,
+        )
+        figure.suptitle(
+            "Latency percentiles by input length\n",
+            fontsize=self._title_fontsize,
+            fontweight=self._fontweight,
+        )
+
+        for axes, builder_mode in zip(all_axes[0], builder_modes):
+            data = self._latencies[self._latencies["mode"] == builder_mode]
+            for color, (method, group) in zip(self._palette, data.groupby("method")):
+                for percentile, linestyle in self._linestyles.items():
+                    axes.plot(
+                        group["length"],
+                        group[f"p{percentile}_ms"],
+                        color=color,
+                        linestyle=linestyle,
+                        linewidth=4,
+                        marker="o",
+                        markersize=10,
+                        label=f"{method} p{percentile}",
+                    )
+
+            axes.set_title(
+                builder_mode, fontsize=self._label_fontsize, fontweight=self._fontweight
+            )
+            axes.set_xscale("log", base=2)
+            axes.set_yscale("log")
+            axes.set_xlabel(
+                "Input length (characters)",
+                fontsize=self._label_fontsize,
+                fontweight=self._fontweight,
+            )
+            axes.set_ylabel(
+                "Latency (ms)",
+                fontsize=self._label_fontsize,
+                fontweight=self._fontweight,
+            )
+            axes.tick_params(axis="both", which="major", labelsize=self._ticks_fontsize)
+            axes.grid(color=self._grid_color, which="both", alpha=0.5)
+
+        all_axes[0][0].legend(fontsize=20, loc="upper left")
+        plt.tight_layout()
+        plt.savefig(file_path, dpi=self._dpi)
+        plt.close()
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    default_languages = [language.name.lower() for language in Language.all()]
+    parser = argparse.ArgumentParser(
+        description="Measure latency percentiles of single detections "
+        "for inputs of controlled lengths"
+    )
+    parser.add_argument(
+        "--modes", nargs="+", choices=_builder_modes, default=list(_builder_modes)
+    )
+    parser.add_argument(
+        "--methods", nargs="+", choices=_methods, default=list(_methods)
+    )
+    parser.add_argument(
+        "--lengths",
+        nargs="+",
+        type=int,
+        default=[1, 4, 16, 64, 256, 1024, 4096, 16384],
+        help="input lengths in characters (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--samples",
+        type=int,
+        default=500,
+        help="number of inputs per length (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=default_languages,
+        default=default_languages,
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    languages = sorted(
+        [Language.from_str(name) for name in args.languages],
+        key=lambda language: language.name,
+    )
+    corpus = TestDataCorpus.load()
+    rng = np.random.default_rng(args.seed)
+    inputs = {
+        length: create_inputs(corpus, languages, length, args.samples, rng)
+        for length in sorted(args.lengths)
+    }
+    rows = []
+
+    for builder_mode in args.modes:
+        print(f"Loading language models in {builder_mode} mode...")
+        detector = build_detector(builder_mode)
+
+        for method in args.methods:
+            # The first calls are not measured as they warm up caches and allocators
+            measure_latencies(detector, method, inputs[min(inputs)][:10])
+
+            for length, texts in inputs.items():
+                print(f"Measuring {method} for {length} characters...")
+                latencies = measure_latencies(detector, method, texts) * 1000
+                rows.append(
+                    {
+                        "mode": builder_mode,
+                        "method": method,
+                        "length": length,
+                        "samples": len(latencies),
+                        **{
+                            f"p{percentile}_ms": np.percentile(latencies, percentile)
+                            for percentile in _percentiles
+                        },
+                        "max_ms": latencies.max(),
+                        "mean_ms": latencies.mean(),
+                    }
+                )
+
+    results = pd.DataFrame(rows).set_index(["mode", "method", "length"])
+    print(results.to_string(float_format="{:.3f}".format))
+
+    report_file_path = (
+        Path(__file__).parent / "../benchmark-reports/latency-percentile-values.csv"
+    )
+    report_file_path.parent.mkdir(parents=True, exist_ok=True)
+    results.round(4).to_csv(report_file_path, na_rep="NaN")
+
+    plot_file_path = Path(__file__).parent / "../images/plots/latency-percentiles.png"
+    LatencyPlotDrawer(results).draw_lineplot(plot_file_path)
+
+    print(f"Latency percentile values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
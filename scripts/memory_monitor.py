@@ -0,0 +1,40 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import psutil
+import threading
+
+
+class PeakMemoryMonitor:
+    def __init__(self, interval: float = 0.01):
+        self._interval = interval
+        self._process = psutil.Process()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self.peak_rss = 0
+
+    def __enter__(self) -> "PeakMemoryMonitor":
+        self.peak_rss = self._process.memory_info().rss
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop_event.set()
+        self._thread.join()
+        self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
+
+    def _sample(self):
+        while not self._stop_event.wait(self._interval):
+            self.peak_rss = max(self.peak_rss, self._process.memory_info().rss)
@@ -0,0 +1,179 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import numpy as np
+
+from lingua import Language
+from pathlib import Path
+from test_data_corpus import Category, TestDataCorpus
+from typing import Any
+
+_default_language_pairs = [
+    "english,german",
+    "english,french",
+    "german,dutch",
+    "spanish,portuguese",
+    "bokmal,danish",
+    "russian,ukrainian",
+    "english,russian",
+]
+
+
+def get_default_corpus_file_path() -> Path:
+    return Path(__file__).parent / "../.cache/mixed-language-corpus.jsonl"
+
+
+def parse_language_pair(language_pair: str) -> tuple[Language, Language]:
+    first_name, second_name = language_pair.split(",")
+    return Language.from_str(first_name), Language.from_str(second_name)
+
+
+def create_document(
+    corpus: TestDataCorpus,
+    languages: tuple[Language, Language],
+    document_length: int,
+    segment_sentences: tuple[int, int],
+    rng: np.random.Generator,
+) -> dict[str, Any]:
+    # The languages alternate from segment to segment, starting with a random one.
+    # Each segment consists of a random number of sentences and includes the
+    # space separating it from the next segment, like the sections returned
+    # by detect_multiple_languages_of.
+    sentences = {
+        language: corpus.get_texts(language, Category.SENTENCES)
+        for language in languages
+    }
+    language_index = int(rng.integers(2))
+    text_parts: list[str] = []
+    segments = []
+    start_index = 0
+
+    while start_index < document_length:
+        language = languages[language_index]
+        sentence_count = int(
+            rng.integers(segment_sentences[0], segment_sentences[1] + 1)
+        )
+        segment = " ".join(
+            sentences[language][idx]
+            for idx in rng.choice(len(sentences[language]), size=sentence_count)
+        )
+        text_parts.append(segment + " ")
+        end_index = start_index + len(segment) + 1
+        segments.append(
+            {
+                "start_index": start_index,
+                "end_index": end_index,
+                "language": language.name,
+            }
+        )
+        start_index = end_index
+        language_index = 1 - language_index
+
+    text = "".join(text_parts)[:-1]
+    segments[-1]["end_index"] = len(text)
+
+    return {
+        "languages": [language.name for language in languages],
+        "document_length": document_length,
+        "segment_sentences": list(segment_sentences),
+        "text": text,
+        "segments": segments,
+    }
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Generate reproducible mixed-language documents with known "
+        "language boundaries from the sentences test data"
+    )
+    parser.add_argument(
+        "--language-pairs",
+        nargs="+",
+        default=_default_language_pairs,
+        help="comma-separated pairs of language names (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--document-lengths",
+        nargs="+",
+        type=int,
+        default=[500, 2000, 8000],
+        help="minimum number of characters per document (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--segment-sentences",
+        nargs="+",
+        default=["1-1", "1-3", "3-6"],
+        help="ranges of the number of sentences per single-language segment "
+        "(default: %(default)s)",
+    )
+    parser.add_argument(
+        "--documents",
+        type=int,
+        default=20,
+        help="number of documents per combination of settings (default: %(default)s)",
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=get_default_corpus_file_path(),
+        help="JSON Lines output file (default: .cache/mixed-language-corpus.jsonl)",
+    )
+    args = parser.parse_args()
+
+    try:
+        args.language_pairs = [
+            parse_language_pair(language_pair) for language_pair in args.language_pairs
+        ]
+        args.segment_sentences = [
+            tuple(int(bound) for bound in sentence_range.split("-"))
+            for sentence_range in args.segment_sentences
+        ]
+    except ValueError as error:
+        parser.error(str(error))
+
+    return args
+
+
+def main():
+    args = parse_command_line_args()
+    corpus = TestDataCorpus.load()
+    rng = np.random.default_rng(args.seed)
+    document_count = 0
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    with args.output.open(mode="w", encoding="utf-8") as output_file:
+        for languages in args.language_pairs:
+            for document_length in args.document_lengths:
+                for segment_sentences in args.segment_sentences:
+                    for _ in range(args.documents):
+                        document = create_document(
+                            corpus, languages, document_length, segment_sentences, rng
+                        )
+                        document["id"] = document_count
+                        output_file.write(json.dumps(document, ensure_ascii=False))
+                        output_file.write("\n")
+                        document_count += 1
+
+    print(
+        f"{document_count} mixed-language documents written to {args.output.resolve()}"
+    )
+
+
+if __name__ == "__main__":
+    main()
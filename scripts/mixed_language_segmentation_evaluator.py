@@ -0,0 +1,218 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import json
+import numpy as np
+import pandas as pd
+import time
+
+from lingua import DetectionResult, Language, LanguageDetector, LanguageDetectorBuilder
+from mixed_language_corpus_generator import get_default_corpus_file_path
+from pathlib import Path
+from streaming_language_detector import compute_agreement
+from typing import Any
+
+
+def count_matching_boundaries(
+    predicted_boundaries: list[int], expected_boundaries: list[int], tolerance: int
+) -> int:
+    # Every expected boundary can be matched by at most one predicted boundary
+    # which is at most tolerance characters away. As both lists are sorted,
+    # a greedy matching from left to right finds the maximum number of matches.
+    match_count = 0
+    predicted_idx = expected_idx = 0
+    while predicted_idx < len(predicted_boundaries) and expected_idx < len(
+        expected_boundaries
+    ):
+        difference = (
+            predicted_boundaries[predicted_idx] - expected_boundaries[expected_idx]
+        )
+        if abs(difference) <= tolerance:
+            match_count += 1
+            predicted_idx += 1
+            expected_idx += 1
+        elif difference < 0:
+            predicted_idx += 1
+        else:
+            expected_idx += 1
+    return match_count
+
+
+def get_boundaries(sections: list[DetectionResult]) -> list[int]:
+    return [section.start_index for section in sections[1:]]
+
+
+def to_detection_results(segments: list[dict[str, Any]]) -> list[DetectionResult]:
+    # The word count is irrelevant for the evaluation
+    return [
+        DetectionResult(
+            segment["start_index"],
+            segment["end_index"],
+            0,
+            Language.from_str(segment["language"]),
+        )
+        for segment in segments
+    ]
+
+
+def evaluate_group(
+    detector: LanguageDetector, documents: list[dict[str, Any]], tolerance: int
+) -> dict[str, Any]:
+    texts = [document["text"] for document in documents]
+    character_count = sum(len(text) for text in texts)
+
+    start = time.perf_counter()
+    all_sections = [detector.detect_multiple_languages_of(text) for text in texts]
+    single_threaded_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    detector.detect_multiple_languages_in_parallel_of(texts)
+    multi_threaded_seconds = time.perf_counter() - start
+
+    predicted_count = expected_count = match_count = 0
+    correct_character_count = 0.0
+    for document, sections in zip(documents, all_sections):
+        expected_sections = to_detection_results(document["segments"])
+        predicted_boundaries = get_boundaries(sections)
+        expected_boundaries = get_boundaries(expected_sections)
+        predicted_count += len(predicted_boundaries)
+        expected_count += len(expected_boundaries)
+        match_count += count_matching_boundaries(
+            predicted_boundaries, expected_boundaries, tolerance
+        )
+        correct_character_count += compute_agreement(
+            len(document["text"]), sections, expected_sections
+        ) * len(document["text"])
+
+    return {
+        "documents": len(documents),
+        # Precision and recall are undefined without any boundaries
+        "boundary_precision": (
+            100 * match_count / predicted_count if predicted_count > 0 else np.nan
+        ),
+        "boundary_recall": (
+            100 * match_count / expected_count if expected_count > 0 else np.nan
+        ),
+        "character_accuracy": 100 * correct_character_count / max(character_count, 1),
+        "predicted_sections_per_document": (predicted_count + len(documents))
+        / len(documents),
+        "expected_sections_per_document": (expected_count + len(documents))
+        / len(documents),
+        "chars_per_second": character_count / single_threaded_seconds,
+        "chars_per_second_in_parallel": character_count / multi_threaded_seconds,
+    }
+
+
+def build_detector(
+    languages: tuple[Language, ...], use_pair_languages: bool, low_accuracy: bool
+) -> LanguageDetector:
+    builder = (
+        LanguageDetectorBuilder.from_languages(*languages)
+        if use_pair_languages
+        else LanguageDetectorBuilder.from_all_languages()
+    )
+    if low_accuracy:
+        builder = builder.with_low_accuracy_mode()
+    return builder.with_preloaded_language_models().build()
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Evaluate the segmentation of mixed-language documents "
+        "by detect_multiple_languages_of"
+    )
+    parser.add_argument(
+        "corpus",
+        nargs="?",
+        type=Path,
+        default=get_default_corpus_file_path(),
+        help="JSON Lines file written by mixed_language_corpus_generator.py "
+        "(default: .cache/mixed-language-corpus.jsonl)",
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=int,
+        default=20,
+        help="maximum distance in characters between a detected and an actual "
+        "language boundary to count as a match (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--pair-languages-only",
+        action="store_true",
+        help="build the detectors from the two languages of each document "
+        "instead of all languages",
+    )
+    parser.add_argument("--low-accuracy", action="store_true")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    groups: dict[tuple, list[dict[str, Any]]] = {}
+
+    with args.corpus.open(mode="r", encoding="utf-8") as corpus_file:
+        for line in corpus_file:
+            document = json.loads(line)
+            key = (
+                tuple(document["languages"]),
+                document["document_length"],
+                "-".join(str(bound) for bound in document["segment_sentences"]),
+            )
+            groups.setdefault(key, []).append(document)
+
+    detectors: dict[tuple[Language, ...], LanguageDetector] = {}
+    rows = []
+
+    for (language_names, document_length, segment_sentences), documents in sorted(
+        groups.items()
+    ):
+        languages = tuple(Language.from_str(name) for name in language_names)
+        detector_key = languages if args.pair_languages_only else ()
+        if detector_key not in detectors:
+            detectors[detector_key] = build_detector(
+                languages, args.pair_languages_only, args.low_accuracy
+            )
+
+        language_pair = "-".join(name.lower() for name in language_names)
+        print(
+            f"Evaluating {language_pair} with {document_length} characters "
+            f"and {segment_sentences} sentences per segment..."
+        )
+        rows.append(
+            {
+                "language_pair": language_pair,
+                "document_length": document_length,
+                "segment_sentences": segment_sentences,
+                **evaluate_group(detectors[detector_key], documents, args.tolerance),
+            }
+        )
+
+    results = pd.DataFrame(rows).set_index(
+        ["language_pair", "document_length", "segment_sentences"]
+    )
+    print(results.to_string(float_format="{:.2f}".format))
+
+    report_file_path = (
+        Path(__file__).parent
+        / "../accuracy-reports/mixed-language-segmentation-values.csv"
+    )
+    results.round(2).to_csv(report_file_path, na_rep="NaN")
+
+    print(f"Segmentation values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import numpy as np
+import pandas as pd
+import platform
+import sys
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from importlib.metadata import version
+from latency_percentile_benchmark import build_detector, measure_latencies
+from lingua import Language
+from memory_monitor import PeakMemoryMonitor
+from pathlib import Path
+from test_data_corpus import TestDataCorpus, test_data_categories
+from typing import Any
+
+_baseline_format_version = 2
+_builder_modes = ("high-accuracy", "low-accuracy")
+
+# The peak memory usage is measured once per mode for all categories together
+_all_categories = "all-categories"
+
+# For every metric, whether larger values are better
+_metrics = {
+    "texts_per_second": True,
+    "p50_ms": False,
+    "p90_ms": False,
+    "p99_ms": False,
+    "peak_rss_mb": False,
+}
+
+
+def run_calibration_workload() -> float:
+    # A fixed mix of hashing, sorting and dictionary lookups whose duration
+    # reflects the single-core speed of the machine. The fastest of three
+    # runs is used, as slower runs only add noise from other processes.
+    rng = np.random.default_rng(0)
+    words = [f"{value:x}" for value in rng.integers(0, 2**32, size=50_000)]
+    durations = []
+    for _ in range(3):
+        start = time.perf_counter()
+        counts: dict[str, int] = {}
+        for word in sorted(words):
+            key = hashlib.sha256(word.encode("utf-8")).hexdigest()[:4]
+            counts[key] = counts.get(key, 0) + 1
+        durations.append(time.perf_counter() - start)
+    return min(durations)
+
+
+def measure_mode(
+    builder_mode: str, language_names: list[str], texts_per_language: int
+) -> dict[str, Any]:
+    corpus = TestDataCorpus.load()
+    languages = [Language.from_str(name) for name in language_names]
+    calibration_seconds = run_calibration_workload()
+    categories: dict[str, dict[str, float]] = {}
+
+    with PeakMemoryMonitor() as monitor:
+        detector = build_detector(builder_mode)
+        for category in test_data_categories:
+            texts = [
+                text
+                for language in languages
+                for text in corpus.get_texts(language, category)[:texts_per_language]
+            ]
+            measure_latencies(detector, "detect_language_of", texts[:10])
+            latencies = measure_latencies(detector, "detect_language_of", texts)
+            categories[category.folder_name()] = {
+                "texts_per_second": len(texts) / latencies.sum(),
+                "p50_ms": np.percentile(latencies, 50) * 1000,
+                "p90_ms": np.percentile(latencies, 90) * 1000,
+                "p99_ms": np.percentile(latencies, 99) * 1000,
+            }
+
+    categories[_all_categories] = {"peak_rss_mb": monitor.peak_rss / 1024**2}
+
+    # The workload is timed again after the measurement,
+    # so that a slow phase of the machine at startup does not skew it
+    calibration_seconds = min(calibration_seconds, run_calibration_workload())
+
+    return {"calibration_seconds": calibration_seconds, "categories": categories}
+
+
+def run_benchmark(
+    builder_modes: list[str],
+    language_names: list[str],
+    texts_per_language: int,
+    repetitions: int,
+) -> dict[str, Any]:
+    measurements: dict[str, dict[str, dict[str, list[float]]]] = {}
+    calibration_seconds: dict[str, list[float]] = {}
+
+    for builder_mode in builder_modes:
+        measurements[builder_mode] = {}
+        calibration_seconds[builder_mode] = []
+
+        # Every repetition runs in a freshly spawned process,
+        # so that the peak memory usage is measured for each of them
+        for repetition in range(repetitions):
+            print(f"Measuring {builder_mode} mode ({repetition + 1}/{repetitions})...")
+            with ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            ) as executor:
+                result = executor.submit(
+                    measure_mode, builder_mode, language_names, texts_per_language
+                ).result()
+
+            calibration_seconds[builder_mode].append(result["calibration_seconds"])
+            for category_name, values in result["categories"].items():
+                category_measurements = measurements[builder_mode].setdefault(
+                    category_name, {}
+                )
+                for metric, value in values.items():
+                    category_measurements.setdefault(metric, []).append(float(value))
+
+    return {
+        "format_version": _baseline_format_version,
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "lingua_version": version("lingua-language-detector"),
+        "python_version": platform.python_version(),
+        "machine": " ".join(
+            part
+            for part in (platform.system(), platform.machine(), platform.processor())
+            if len(part) > 0
+        ),
+        "settings": {
+            "modes": builder_modes,
+            "languages": language_names,
+            "texts_per_language": texts_per_language,
+            "repetitions": repetitions,
+        },
+        "calibration_seconds": calibration_seconds,
+        "measurements": measurements,
+    }
+
+
+def normalize(
+    values: list[float], calibration_seconds: list[float], metric: str
+) -> np.ndarray:
+    # Durations are expressed in multiples of the calibration workload,
+    # so that measurements taken on machines of different speed are comparable.
+    # Memory usage does not depend on the speed of the machine.
+    values_array = np.array(values)
+    calibration_array = np.array(calibration_seconds)
+    if metric == "peak_rss_mb":
+        return values_array
+    if metric == "texts_per_second":
+        return values_array * calibration_array
+    return values_array / calibration_array
+
+
+def compute_p_value(
+    baseline_values: np.ndarray,
+    current_values: np.ndarray,
+    larger_is_better: bool,
+    permutation_count: int,
+    rng: np.random.Generator,
+) -> float:
+    # One-sided permutation test of the hypothesis that the current
+    # measurements are not worse on average than the baseline measurements
+    sign = -1 if larger_is_better else 1
+    observed_difference = sign * (current_values.mean() - baseline_values.mean())
+    pooled_values = np.concatenate([baseline_values, current_values])
+    permutations = rng.permuted(np.tile(pooled_values, (permutation_count, 1)), axis=1)
+    baseline_count = len(baseline_values)
+    differences = sign * (
+        permutations[:, baseline_count:].mean(axis=1)
+        - permutations[:, :baseline_count].mean(axis=1)
+    )
+    return float(
+        (np.sum(differences >= observed_difference) + 1) / (permutation_count + 1)
+    )
+
+
+def compare_with_baseline(
+    baseline: dict[str, Any],
+    current: dict[str, Any],
+    significance_level: float,
+    tolerance: float,
+    seed: int,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for builder_mode, categories in baseline["measurements"].items():
+        baseline_calibration = baseline["calibration_seconds"][builder_mode]
+        current_calibration = current["calibration_seconds"][builder_mode]
+
+        for category_name, metrics in categories.items():
+            for metric in metrics:
+                larger_is_better = _metrics[metric]
+                baseline_values = normalize(
+                    metrics[metric], baseline_calibration, metric
+                )
+                current_values = normalize(
+                    current["measurements"][builder_mode][category_name][metric],
+                    current_calibration,
+                    metric,
+                )
+                change = current_values.mean() / baseline_values.mean() - 1
+                slowdown = -change if larger_is_better else change
+                p_value = compute_p_value(
+                    baseline_values, current_values, larger_is_better, 10_000, rng
+                )
+                rows.append(
+                    {
+                        "mode": builder_mode,
+                        "category": category_name,
+                        "metric": metric,
+                        "baseline": np.mean(metrics[metric]),
+                        "current": np.mean(
+                            current["measurements"][builder_mode][category_name][metric]
+                        ),
+                        "normalized_change_percent": change * 100,
+                        "p_value": p_value,
+                        "is_regression": bool(
+                            p_value < significance_level and slowdown > tolerance
+                        ),
+                    }
+                )
+
+    return pd.DataFrame(rows).set_index(["mode", "category", "metric"])
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    # Sorted, so that baselines are reproducible and can be diffed
+    default_languages = sorted(language.name.lower() for language in Language.all())
+    default_baseline_file_path = (
+        Path(__file__).parent / "../performance-baselines/baseline.json"
+    )
+    parser = argparse.ArgumentParser(
+        description="Record performance baselines and check for regressions against them"
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    record_parser = subparsers.add_parser(
+        "record", help="run the benchmark and store its results as the new baseline"
+    )
+    record_parser.add_argument(
+        "--modes", nargs="+", choices=_builder_modes, default=list(_builder_modes)
+    )
+    record_parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=default_languages,
+        default=default_languages,
+    )
+    record_parser.add_argument(
+        "--texts-per-language",
+        type=int,
+        default=20,
+        help="number of texts per language and category (default: %(default)s)",
+    )
+    record_parser.add_argument(
+        "--repetitions",
+        type=int,
+        default=5,
+        help="number of fresh processes per mode (default: %(default)s)",
+    )
+
+    compare_parser = subparsers.add_parser(
+        "compare",
+        help="run the benchmark with the settings of the baseline and fail "
+        "on significant regressions",
+    )
+    compare_parser.add_argument(
+        "--significance-level",
+        type=float,
+        default=0.05,
+        help="significance level of the permutation tests (default: %(default)s)",
+    )
+    compare_parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="relative slowdown that is tolerated even if it is significant "
+        "(default: %(default)s)",
+    )
+    compare_parser.add_argument("--seed", type=int, default=42)
+
+    for subparser in (record_parser, compare_parser):
+        subparser.add_argument(
+            "--baseline",
+            type=Path,
+            default=default_baseline_file_path,
+            help="baseline file (default: performance-baselines/baseline.json)",
+        )
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+
+    if args.command == "record":
+        baseline = run_benchmark(
+            args.modes, args.languages, args.texts_per_language, args.repetitions
+        )
+        args.baseline.parent.mkdir(parents=True, exist_ok=True)
+        with args.baseline.open(mode="w", encoding="utf-8") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2)
+            baseline_file.write("\n")
+        print(f"Performance baseline written to {args.baseline.resolve()}")
+        return
+
+    try:
+        with args.baseline.open(mode="r", encoding="utf-8") as baseline_file:
+            baseline = json.load(baseline_file)
+    except FileNotFoundError:
+        sys.exit(
+            f"No performance baseline found at {args.baseline}, run 'record' first"
+        )
+    if baseline.get("format_version") != _baseline_format_version:
+        sys.exit(f"Unsupported baseline format in {args.baseline}")
+
+    settings = baseline["settings"]
+    current = run_benchmark(
+        settings["modes"],
+        settings["languages"],
+        settings["texts_per_language"],
+        settings["repetitions"],
+    )
+    comparison = compare_with_baseline(
+        baseline, current, args.significance_level, args.tolerance, args.seed
+    )
+    print(comparison.to_string(float_format="{:.4f}".format))
+
+    report_file_path = (
+        Path(__file__).parent / "../benchmark-reports/performance-comparison.csv"
+    )
+    report_file_path.parent.mkdir(parents=True, exist_ok=True)
+    comparison.round(4).to_csv(report_file_path, na_rep="NaN")
+    print(f"Performance comparison written to {report_file_path.resolve()}")
+
+    regressions = comparison[comparison["is_regression"]]
+    if len(regressions) > 0:
+        sys.exit(
+            f"{len(regressions)} significant performance regressions "
+            f"compared to Lingua {baseline['lingua_version']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
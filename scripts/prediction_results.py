@@ -0,0 +1,337 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import os
+import pandas as pd
+
+from dataclasses import dataclass
+from lingua import Language
+from pathlib import Path
+from test_data_corpus import Category, test_data_categories
+from typing import Optional
+
+# Languages are stored as integer codes, the code -1 means that
+# a detector could not decide on any language
+supported_languages = sorted(Language.all(), key=lambda language: language.name)
+unknown_language_code = -1
+
+_language_codes: dict[Optional[Language], int] = {
+    language: code for code, language in enumerate(supported_languages)
+}
+_language_codes[None] = unknown_language_code
+
+
+def encode_language(language: Optional[Language]) -> int:
+    return _language_codes[language]
+
+
+def decode_language(code: int) -> Optional[Language]:
+    if code == unknown_language_code:
+        return None
+    return supported_languages[code]
+
+
+def encode_languages(detected_languages: list[Optional[Language]]) -> np.ndarray:
+    return np.fromiter(
+        (_language_codes[language] for language in detected_languages),
+        dtype=np.int8,
+        count=len(detected_languages),
+    )
+
+
+def get_results_directory() -> Path:
+    return Path(__file__).parent / "../accuracy-reports/predictions"
+
+
+@dataclass
+class PredictionResults:
+    # One row per detector, category and text
+    detector_names: list[str]
+    detector: np.ndarray
+    category: np.ndarray
+    language: np.ndarray
+    expected: np.ndarray
+    predicted: np.ndarray
+    text_index: np.ndarray
+    text_length: np.ndarray
+
+    @classmethod
+    def from_detected_languages(
+        cls,
+        detector_name: str,
+        language: Language,
+        category: Category,
+        expected_language: Optional[Language],
+        detected_languages: list[Optional[Language]],
+        texts: list[str],
+    ) -> "PredictionResults":
+        row_count = len(texts)
+        return PredictionResults(
+            detector_names=[detector_name],
+            detector=np.zeros(row_count, dtype=np.int16),
+            category=np.full(row_count, category.value, dtype=np.int8),
+            language=np.full(row_count, encode_language(language), dtype=np.int8),
+            expected=np.full(
+                row_count, encode_language(expected_language), dtype=np.int8
+            ),
+            predicted=encode_languages(detected_languages),
+            text_index=np.arange(row_count, dtype=np.int32),
+            text_length=np.fromiter(
+                (len(text) for text in texts), dtype=np.int32, count=row_count
+            ),
+        )
+
+    @classmethod
+    def concat(cls, all_results: list["PredictionResults"]) -> "PredictionResults":
+        detector_names: list[str] = []
+        detector_columns = []
+
+        for results in all_results:
+            codes = []
+            for name in results.detector_names:
+                if name not in detector_names:
+                    detector_names.append(name)
+                codes.append(detector_names.index(name))
+            detector_columns.append(
+                np.array(codes, dtype=np.int16)[results.detector]
+                if len(codes) > 0
+                else results.detector
+            )
+
+        def concat_column(name: str, dtype: type) -> np.ndarray:
+            return np.concatenate(
+                [getattr(results, name) for results in all_results]
+                + [np.array([], dtype=dtype)]
+            ).astype(dtype)
+
+        return PredictionResults(
+            detector_names=detector_names,
+            detector=np.concatenate(
+                detector_columns + [np.array([], dtype=np.int16)]
+            ).astype(np.int16),
+            category=concat_column("category", np.int8),
+            language=concat_column("language", np.int8),
+            expected=concat_column("expected", np.int8),
+            predicted=concat_column("predicted", np.int8),
+            text_index=concat_column("text_index", np.int32),
+            text_length=concat_column("text_length", np.int32),
+        )
+
+    @classmethod
+    def load(cls, file_path: Path) -> "PredictionResults":
+        with np.load(file_path) as data:
+            return PredictionResults(
+                detector_names=data["detector_names"].tolist(),
+                detector=data["detector"],
+                category=data["category"],
+                language=data["language"],
+                expected=data["expected"],
+                predicted=data["predicted"],
+                text_index=data["text_index"],
+                text_length=data["text_length"],
+            )
+
+    @classmethod
+    def load_detectors(cls, detector_names: list[str]) -> "PredictionResults":
+        results_directory = get_results_directory()
+        return PredictionResults.concat(
+            [
+                PredictionResults.load(results_directory / f"{detector_name}.npz")
+                for detector_name in detector_names
+            ]
+        )
+
+    @classmethod
+    def load_all(cls) -> "PredictionResults":
+        return PredictionResults.concat(
+            [
+                PredictionResults.load(file_path)
+                for file_path in sorted(get_results_directory().glob("*.npz"))
+            ]
+        )
+
+    def save(self, file_path: Path):
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_file_path = file_path.with_name(f"{file_path.stem}.tmp.npz")
+        np.savez_compressed(
+            temporary_file_path,
+            detector_names=np.array(self.detector_names, dtype=str),
+            detector=self.detector,
+            category=self.category,
+            language=self.language,
+            expected=self.expected,
+            predicted=self.predicted,
+            text_index=self.text_index,
+            text_length=self.text_length,
+        )
+        os.replace(temporary_file_path, file_path)
+
+    def select(self, mask: np.ndarray) -> "PredictionResults":
+        used_codes = np.unique(self.detector[mask])
+        remapped_codes = np.zeros(max(len(self.detector_names), 1), dtype=np.int16)
+        remapped_codes[used_codes] = np.arange(len(used_codes), dtype=np.int16)
+        return PredictionResults(
+            detector_names=[self.detector_names[code] for code in used_codes],
+            detector=remapped_codes[self.detector[mask]],
+            category=self.category[mask],
+            language=self.language[mask],
+            expected=self.expected[mask],
+            predicted=self.predicted[mask],
+            text_index=self.text_index[mask],
+            text_length=self.text_length[mask],
+        )
+
+    def merge(self, newer_results: "PredictionResults") -> "PredictionResults":
+        # The rows of every (language, category) unit of the newer results
+        # replace all rows of the same unit, the other units are kept
+        category_count = max(category.value for category in Category) + 1
+
+        def get_unit_keys(results: "PredictionResults") -> np.ndarray:
+            return results.language.astype(np.int64) * category_count + results.category
+
+        is_kept = ~np.isin(get_unit_keys(self), get_unit_keys(newer_results))
+        return PredictionResults.concat([self.select(is_kept), newer_results])
+
+    def is_correct(self) -> np.ndarray:
+        return self.predicted == self.expected
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "detector": pd.Categorical.from_codes(
+                    self.detector, categories=self.detector_names
+                ),
+                "category": self.category,
+                "language": self.language,
+                "expected": self.expected,
+                "predicted": self.predicted,
+                "text_index": self.text_index,
+                "text_length": self.text_length,
+            }
+        )
+
+    def compute_confusion_matrices(self) -> np.ndarray:
+        # The result is indexed by detector, test data category, true language
+        # and detected language code plus one, so the first column holds the
+        # texts that could not be classified at all
+        language_count = len(supported_languages)
+        shape = (
+            len(self.detector_names),
+            len(test_data_categories),
+            language_count,
+            language_count + 1,
+        )
+        category_positions = np.zeros(
+            max(category.value for category in Category) + 1, dtype=np.int64
+        )
+        for position, category in enumerate(test_data_categories):
+            category_positions[category.value] = position
+
+        flat_indices = np.ravel_multi_index(
+            (
+                self.detector.astype(np.int64),
+                category_positions[self.category],
+                self.language.astype(np.int64),
+                self.predicted.astype(np.int64) + 1,
+            ),
+            shape,
+        )
+        return (
+            np.bincount(flat_indices, minlength=int(np.prod(shape)))
+            .reshape(shape)
+            .astype(np.int32)
+        )
+
+    def count_predictions(self) -> "PredictionCounts":
+        # Each combination of detector, language and category forms one unit
+        unit_keys = (
+            self.detector.astype(np.int64) * 256 + self.language.astype(np.int64) + 128
+        ) * 256 + self.category.astype(np.int64)
+        unit_keys, first_rows, unit_ids = np.unique(
+            unit_keys, return_index=True, return_inverse=True
+        )
+        unit_count = len(unit_keys)
+        column_count = len(supported_languages) + 1
+
+        counts = np.bincount(
+            unit_ids * column_count + self.predicted.astype(np.int64) + 1,
+            minlength=unit_count * column_count,
+        ).reshape(unit_count, column_count)
+
+        return PredictionCounts(
+            detector_names=self.detector_names,
+            detector=self.detector[first_rows],
+            category=self.category[first_rows],
+            language=self.language[first_rows],
+            expected=self.expected[first_rows],
+            counts=counts,
+            text_count=counts.sum(axis=1),
+            text_length_sum=np.bincount(
+                unit_ids, weights=self.text_length, minlength=unit_count
+            ).astype(np.int64),
+        )
+
+
+@dataclass
+class PredictionCounts:
+    # One row per detector, language and category, the columns of the count
+    # matrix hold the number of texts per detected language code plus one
+    detector_names: list[str]
+    detector: np.ndarray
+    category: np.ndarray
+    language: np.ndarray
+    expected: np.ndarray
+    counts: np.ndarray
+    text_count: np.ndarray
+    text_length_sum: np.ndarray
+
+    def compute_accuracies(self) -> np.ndarray:
+        unit_ids = np.arange(len(self.counts))
+        correct_count = self.counts[unit_ids, self.expected.astype(np.int64) + 1]
+        return correct_count / self.text_count
+
+    def to_accuracy_dataframes(self) -> dict[Category, pd.DataFrame]:
+        frame = pd.DataFrame(
+            {
+                "detector": [self.detector_names[code] for code in self.detector],
+                "language": [
+                    supported_languages[code].name.title() for code in self.language
+                ],
+                "category": self.category,
+                "accuracy": self.compute_accuracies(),
+            }
+        )
+        table = frame.pivot_table(
+            index=["language", "detector"],
+            columns="category",
+            values="accuracy",
+            aggfunc="first",
+        )
+        single_words, word_pairs, sentences = (
+            table[category.value] for category in test_data_categories
+        )
+        accuracies = {
+            Category.AVERAGE: (single_words + word_pairs + sentences) / 3,
+            Category.SINGLE_WORDS: single_words,
+            Category.WORD_PAIRS: word_pairs,
+            Category.SENTENCES: sentences,
+        }
+
+        # An accuracy of zero means that no report has been written for the language
+        return {
+            category: (accuracy.where(accuracy > 0) * 100).unstack("detector")
+            for category, accuracy in accuracies.items()
+        }
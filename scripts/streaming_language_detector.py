@@ -0,0 +1,285 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import io
+import json
+import numpy as np
+import re
+import sys
+import time
+
+from bulk_language_detector import build_detector, open_binary_input, open_text_output
+from contextlib import ExitStack
+from lingua import DetectionResult, Language, LanguageDetector
+from prediction_results import encode_language
+from typing import Any, Iterable, Iterator, Optional, TextIO
+
+_word_pattern = re.compile(r"[^\W\d_]+")
+
+
+class _SectionMerger:
+    # Sections are held back until the next section is known, so that
+    # adjacent sections of the same language are reported as one section.
+    # Every section starts where the previous one has ended, as the sections
+    # of detect_multiple_languages_of cover the complete text as well.
+    _pending: Optional[tuple[int, int, int, Language]]
+
+    def __init__(self):
+        self._pending = None
+        self._next_start_index = 0
+
+    def add(
+        self, end_index: int, word_count: int, language: Language
+    ) -> Optional[DetectionResult]:
+        finished_section = None
+        if self._pending is not None and self._pending[3] == language:
+            start_index, _, pending_word_count, _ = self._pending
+            self._pending = (
+                start_index,
+                end_index,
+                pending_word_count + word_count,
+                language,
+            )
+        else:
+            finished_section = self.flush()
+            self._pending = (self._next_start_index, end_index, word_count, language)
+        self._next_start_index = end_index
+        return finished_section
+
+    def flush(self) -> Optional[DetectionResult]:
+        if self._pending is None:
+            return None
+        section = DetectionResult(*self._pending)
+        self._pending = None
+        return section
+
+
+class StreamingLanguageDetector:
+    # The text is segmented window by window. Only the sections that end before
+    # the last lookahead characters of a window are final. The next window
+    # starts at the end of the last final section, so that sections crossing
+    # window or chunk boundaries are classified with their following context.
+    # At most window_size plus chunk_size characters are kept in memory.
+    def __init__(
+        self,
+        detector: LanguageDetector,
+        window_size: int = 8192,
+        lookahead: int = 2048,
+        chunk_size: int = 65536,
+    ):
+        if not 0 < lookahead < window_size:
+            raise ValueError("lookahead must be between 0 and window_size")
+        self._detector = detector
+        self._window_size = window_size
+        self._lookahead = lookahead
+        self._chunk_size = chunk_size
+
+    def detect_multiple_languages_of(
+        self, source: Iterable[str] | TextIO
+    ) -> Iterator[DetectionResult]:
+        merger = _SectionMerger()
+        buffer = ""
+        buffer_offset = 0
+
+        for chunk in self._read_chunks(source):
+            buffer += chunk
+            while len(buffer) >= self._window_size:
+                final_sections, cut_index = self._find_final_sections(
+                    buffer[: self._window_size]
+                )
+                for end_index, word_count, language in final_sections:
+                    section = merger.add(
+                        buffer_offset + end_index, word_count, language
+                    )
+                    if section is not None:
+                        yield section
+                buffer = buffer[cut_index:]
+                buffer_offset += cut_index
+
+        for section in self._detector.detect_multiple_languages_of(buffer):
+            finished_section = merger.add(
+                buffer_offset + section.end_index, section.word_count, section.language
+            )
+            if finished_section is not None:
+                yield finished_section
+
+        last_section = merger.flush()
+        if last_section is not None:
+            yield last_section
+
+    def _find_final_sections(
+        self, window: str
+    ) -> tuple[list[tuple[int, int, Language]], int]:
+        final_index = self._window_size - self._lookahead
+        sections = self._detector.detect_multiple_languages_of(window)
+        final_sections = [
+            (section.end_index, section.word_count, section.language)
+            for section in sections
+            if section.end_index <= final_index
+        ]
+        if len(final_sections) > 0:
+            return final_sections, final_sections[-1][0]
+
+        # A window without any letters is skipped, its characters are added
+        # to the next section. If a single section covers the complete window,
+        # it is split at the last whitespace before the lookahead, and its
+        # word count is estimated for the final part.
+        if len(sections) == 0:
+            return [], final_index
+        first_section = sections[0]
+        split_index = window.rfind(" ", first_section.start_index, final_index) + 1
+        if split_index <= first_section.start_index:
+            split_index = final_index
+        word_count = len(
+            _word_pattern.findall(window[first_section.start_index : split_index])
+        )
+        return [(split_index, word_count, first_section.language)], split_index
+
+    def _read_chunks(self, source: Iterable[str] | TextIO) -> Iterator[str]:
+        if hasattr(source, "read"):
+            read = source.read
+            return iter(lambda: read(self._chunk_size), "")
+        return iter(source)
+
+
+def serialize_section(section: DetectionResult) -> dict[str, Any]:
+    return {
+        "start_index": section.start_index,
+        "end_index": section.end_index,
+        "word_count": section.word_count,
+        "language": section.language.name,
+    }
+
+
+def compute_agreement(
+    text_length: int,
+    sections: list[DetectionResult],
+    reference_sections: list[DetectionResult],
+) -> float:
+    # The share of characters that are assigned to the same language
+    labels = np.full(text_length, -1, dtype=np.int16)
+    reference_labels = np.full(text_length, -1, dtype=np.int16)
+    for section_list, label_array in (
+        (sections, labels),
+        (reference_sections, reference_labels),
+    ):
+        for section in section_list:
+            label_array[section.start_index : section.end_index] = encode_language(
+                section.language
+            )
+    return float(np.mean(labels == reference_labels)) if text_length > 0 else 1.0
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Detect the language sections of large mixed-language documents "
+        "with constant memory usage and write them as JSON Lines"
+    )
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default="-",
+        help="text file, optionally gzip- or zstd-compressed, "
+        "'-' reads from stdin (default: stdin)",
+    )
+    parser.add_argument("-o", "--output", help="output file (default: stdout)")
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=[language.name.lower() for language in Language.all()],
+    )
+    parser.add_argument("--low-accuracy", action="store_true")
+    parser.add_argument("--minimum-relative-distance", type=float, default=0.0)
+    parser.add_argument(
+        "--window-size",
+        type=int,
+        default=8192,
+        help="number of characters segmented at once (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--lookahead",
+        type=int,
+        default=2048,
+        help="number of characters at the end of a window whose sections are "
+        "not final yet (default: %(default)s)",
+    )
+    parser.add_argument("--chunk-size", type=int, default=65536)
+    parser.add_argument(
+        "--compare",
+        action="store_true",
+        help="segment the complete document at once as well and report the share "
+        "of characters assigned to the same language",
+    )
+    args = parser.parse_args()
+
+    if not 0 < args.lookahead < args.window_size:
+        parser.error("--lookahead must be between 0 and --window-size")
+    if args.compare and args.file == "-":
+        parser.error("--compare requires a file as it is read twice")
+
+    return args
+
+
+def main():
+    args = parse_command_line_args()
+    detector = build_detector(args)
+    streaming_detector = StreamingLanguageDetector(
+        detector, args.window_size, args.lookahead, args.chunk_size
+    )
+    sections = []
+    first_section_seconds = None
+
+    with ExitStack() as exit_stack:
+        text_stream = io.TextIOWrapper(
+            open_binary_input(args.file, exit_stack), encoding="utf-8", newline=""
+        )
+        exit_stack.callback(text_stream.detach)
+        output = open_text_output(args.output, exit_stack)
+
+        start = time.perf_counter()
+        for section in streaming_detector.detect_multiple_languages_of(text_stream):
+            if first_section_seconds is None:
+                first_section_seconds = time.perf_counter() - start
+            output.write(json.dumps(serialize_section(section)) + "\n")
+            if args.compare:
+                sections.append(section)
+        streaming_seconds = time.perf_counter() - start
+
+    print(
+        f"Streaming segmentation finished in {streaming_seconds:.2f} seconds, "
+        f"first section after {first_section_seconds or 0.0:.3f} seconds",
+        file=sys.stderr,
+    )
+
+    if args.compare:
+        with ExitStack() as exit_stack:
+            text = io.TextIOWrapper(
+                open_binary_input(args.file, exit_stack), encoding="utf-8", newline=""
+            ).read()
+        start = time.perf_counter()
+        reference_sections = detector.detect_multiple_languages_of(text)
+        whole_document_seconds = time.perf_counter() - start
+        agreement = compute_agreement(len(text), sections, reference_sections)
+        print(
+            f"Whole-document segmentation finished in {whole_document_seconds:.2f} "
+            f"seconds, {len(reference_sections)} versus {len(sections)} sections, "
+            f"{agreement * 100:.2f}% of characters assigned to the same language",
+            file=sys.stderr,
+        )
+
+
+if __name__ == "__main__":
+    main()
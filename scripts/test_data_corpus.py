@@ -0,0 +1,186 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import hashlib
+import io
+import json
+import mmap
+import numpy as np
+import os
+import time
+
+from enum import Enum, auto
+from lingua import Language
+from pathlib import Path
+from typing import Optional
+
+
+class Category(Enum):
+    AVERAGE = auto()
+    SINGLE_WORDS = auto()
+    WORD_PAIRS = auto()
+    SENTENCES = auto()
+
+    def folder_name(self) -> str:
+        return self.name.lower().replace("_", "-")
+
+
+test_data_categories = (Category.SINGLE_WORDS, Category.WORD_PAIRS, Category.SENTENCES)
+
+
+def get_test_data_file_path(language: Language, category: Category) -> Path:
+    test_data_directory = Path(__file__).parent / "../language-testdata"
+    test_data_file_name = f"{language.iso_code_639_1.name.lower()}.txt"
+    return test_data_directory / category.folder_name() / test_data_file_name
+
+
+class TestDataCorpus:
+    # All test data files are stored in a single buffer of newline-separated
+    # UTF-8 texts. The byte offset of each text is stored in a separate array,
+    # so both files can be memory-mapped and shared by all processes.
+    _corpus_directory = Path(__file__).parent / "../.cache/corpus"
+    _texts_file_name = "texts.bin"
+    _offsets_file_name = "offsets.npy"
+    _index_file_name = "index.json"
+    _instance: Optional["TestDataCorpus"] = None
+
+    def __init__(self, corpus_directory: Path):
+        with (corpus_directory / self._index_file_name).open(mode="r") as index_file:
+            self._index = {
+                (Language.from_str(entry["language"]), Category[entry["category"]]): (
+                    entry
+                )
+                for entry in json.load(index_file)
+            }
+
+        self._offsets = np.load(
+            corpus_directory / self._offsets_file_name, mmap_mode="r"
+        )
+
+        with (corpus_directory / self._texts_file_name).open(mode="rb") as texts_file:
+            self._buffer = (
+                mmap.mmap(texts_file.fileno(), 0, access=mmap.ACCESS_READ)
+                if self._offsets[-1] > 0
+                else b""
+            )
+
+    @classmethod
+    def load(cls) -> "TestDataCorpus":
+        if cls._instance is None:
+            if not cls._is_up_to_date(cls._corpus_directory):
+                cls.build(cls._corpus_directory)
+            cls._instance = TestDataCorpus(cls._corpus_directory)
+        return cls._instance
+
+    @classmethod
+    def build(cls, corpus_directory: Path):
+        corpus_directory.mkdir(parents=True, exist_ok=True)
+        index = []
+        offsets = [0]
+        temporary_texts_file_path = corpus_directory / f"{cls._texts_file_name}.tmp"
+
+        with temporary_texts_file_path.open(mode="wb") as texts_file:
+            for category in test_data_categories:
+                for language in sorted(Language.all(), key=lambda lang: lang.name):
+                    test_data_file_path = get_test_data_file_path(language, category)
+                    content = test_data_file_path.read_bytes()
+                    start = len(offsets) - 1
+
+                    # Lines are split the same way as in text mode
+                    lines = io.StringIO(content.decode("utf-8"), newline=None)
+                    for line in lines:
+                        text = line.rstrip()
+                        if len(text) > 0:
+                            encoded_text = text.encode("utf-8") + b"\n"
+                            texts_file.write(encoded_text)
+                            offsets.append(offsets[-1] + len(encoded_text))
+
+                    file_stat = test_data_file_path.stat()
+                    index.append(
+                        {
+                            "category": category.name,
+                            "language": language.name,
+                            "start": start,
+                            "stop": len(offsets) - 1,
+                            "sha256": hashlib.sha256(content).hexdigest(),
+                            "size": file_stat.st_size,
+                            "mtime_ns": file_stat.st_mtime_ns,
+                        }
+                    )
+
+        temporary_offsets_file_path = corpus_directory / f"{cls._offsets_file_name}.tmp"
+        with temporary_offsets_file_path.open(mode="wb") as offsets_file:
+            np.save(offsets_file, np.array(offsets, dtype=np.int64))
+
+        temporary_index_file_path = corpus_directory / f"{cls._index_file_name}.tmp"
+        with temporary_index_file_path.open(mode="w") as index_file:
+            json.dump(index, index_file)
+
+        os.replace(temporary_texts_file_path, corpus_directory / cls._texts_file_name)
+        os.replace(
+            temporary_offsets_file_path, corpus_directory / cls._offsets_file_name
+        )
+        # The index is replaced last as it marks the corpus as complete
+        os.replace(temporary_index_file_path, corpus_directory / cls._index_file_name)
+
+    @classmethod
+    def _is_up_to_date(cls, corpus_directory: Path) -> bool:
+        try:
+            with (corpus_directory / cls._index_file_name).open(mode="r") as index_file:
+                index = json.load(index_file)
+        except FileNotFoundError:
+            return False
+
+        if len(index) != len(test_data_categories) * len(Language.all()):
+            return False
+
+        for entry in index:
+            test_data_file_path = get_test_data_file_path(
+                Language.from_str(entry["language"]), Category[entry["category"]]
+            )
+            try:
+                file_stat = test_data_file_path.stat()
+            except FileNotFoundError:
+                return False
+            if (
+                file_stat.st_size != entry["size"]
+                or file_stat.st_mtime_ns != entry["mtime_ns"]
+            ):
+                return False
+
+        return True
+
+    def get_texts(self, language: Language, category: Category) -> list[str]:
+        entry = self._index[(language, category)]
+        start, stop = entry["start"], entry["stop"]
+        if start == stop:
+            return []
+        # The trailing newline of the last text is dropped before splitting
+        segment = self._buffer[self._offsets[start] : self._offsets[stop] - 1]
+        return bytes(segment).decode("utf-8").split("\n")
+
+    def get_text_count(self, language: Language, category: Category) -> int:
+        entry = self._index[(language, category)]
+        return entry["stop"] - entry["start"]
+
+    def get_file_hash(self, language: Language, category: Category) -> str:
+        return self._index[(language, category)]["sha256"]
+
+
+if __name__ == "__main__":
+    start = time.perf_counter()
+    TestDataCorpus.build(TestDataCorpus._corpus_directory)
+    stop = time.perf_counter()
+    print(f"Test data corpus built in {stop - start:.2f} seconds")
@@ -0,0 +1,179 @@
+#
+# Copyright © 2022-present Peter M. Stahl pemistahl@gmail.com
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+# http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either expressed or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import argparse
+import multiprocessing
+import pandas as pd
+import time
+
+from accuracy_reporter import (
+    create_detector_instance,
+    get_detector_choices,
+    parse_detector_names,
+)
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from lingua import Language
+from memory_monitor import PeakMemoryMonitor
+from pathlib import Path
+from test_data_corpus import Category, test_data_categories
+
+
+@dataclass
+class ThroughputMeasurement:
+    detector_name: str
+    category: Category
+    text_count: int
+    seconds: float
+    peak_rss: int
+
+    def to_dataframe(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            {
+                "texts": [self.text_count],
+                "seconds": [round(self.seconds, 2)],
+                "texts_per_second": [round(self.text_count / self.seconds, 2)],
+                "peak_rss_mb": [round(self.peak_rss / 1024**2, 2)],
+            },
+            index=pd.MultiIndex.from_tuples(
+                [(self.detector_name, self.category.folder_name())],
+                names=["detector", "category"],
+            ),
+        )
+
+
+def measure_throughput(
+    detector_name: str, languages: list[Language], use_multiple_threads: bool
+) -> list[ThroughputMeasurement]:
+    detector = create_detector_instance(detector_name, languages)
+    if detector is None:
+        return []
+
+    detect = detector._detect_in_parallel if use_multiple_threads else detector._detect
+    measurements = []
+    total_text_count = 0
+    total_seconds = 0.0
+    total_peak_rss = 0
+
+    for category in test_data_categories:
+        test_data = detector.get_test_data(category)
+        text_count = sum(len(texts) for texts in test_data.values())
+
+        with PeakMemoryMonitor() as monitor:
+            start = time.perf_counter()
+            for texts in test_data.values():
+                detect(texts)
+            stop = time.perf_counter()
+
+        measurements.append(
+            ThroughputMeasurement(
+                detector_name, category, text_count, stop - start, monitor.peak_rss
+            )
+        )
+        total_text_count += text_count
+        total_seconds += stop - start
+        total_peak_rss = max(total_peak_rss, monitor.peak_rss)
+
+    # The average category holds the totals over all categories
+    measurements.append(
+        ThroughputMeasurement(
+            detector_name,
+            Category.AVERAGE,
+            total_text_count,
+            total_seconds,
+            total_peak_rss,
+        )
+    )
+
+    return measurements
+
+
+def parse_command_line_args() -> argparse.Namespace:
+    default_languages = [language.name.lower() for language in Language.all()]
+    default_detectors, detector_choices = get_detector_choices()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--detectors",
+        nargs="+",
+        choices=detector_choices,
+        default=[
+            detector_name
+            for detector_name in default_detectors
+            if not detector_name.endswith("-detector")
+        ],
+    )
+    parser.add_argument(
+        "--languages",
+        nargs="+",
+        choices=default_languages,
+        default=default_languages,
+    )
+    parser.add_argument(
+        "--parallel",
+        action="store_true",
+        help="use the multi-threaded methods of Lingua",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_command_line_args()
+    detector_names = parse_detector_names(args.detectors, args.languages)
+    languages = sorted([Language.from_str(name) for name in args.languages])
+    report_file_path = (
+        Path(__file__).parent / "../benchmark-reports/throughput-values.csv"
+    )
+    dataframes = []
+
+    for detector_name in detector_names:
+        print(f"Measuring {detector_name} throughput...")
+
+        # Every detector runs in a freshly spawned process so that
+        # peak memory usage is not distorted by previous detectors
+        with ProcessPoolExecutor(
+            max_workers=1, mp_context=multiprocessing.get_context("spawn")
+        ) as executor:
+            measurements = executor.submit(
+                measure_throughput, detector_name, languages, args.parallel
+            ).result()
+
+        for measurement in measurements:
+            print(
+                f"{measurement.category.folder_name()}: "
+                f"{measurement.text_count} texts in {measurement.seconds:.2f} seconds"
+            )
+            dataframes.append(measurement.to_dataframe())
+
+        print()
+
+    if len(dataframes) == 0:
+        return
+
+    results = pd.concat(dataframes)
+    report_file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    try:
+        dataframe = pd.read_csv(report_file_path, index_col=["detector", "category"])
+        results = pd.concat([dataframe.drop(results.index, errors="ignore"), results])
+    except FileNotFoundError:
+        pass
+
+    results.sort_index().to_csv(report_file_path, na_rep="NaN")
+
+    print(f"Throughput values written to {report_file_path.resolve()}")
+
+
+if __name__ == "__main__":
+    main()